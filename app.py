@@ -1,14 +1,30 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, g, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import aliased, load_only
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from collections import OrderedDict
+from itertools import islice
+from array import array
 import os
+import re
+import zlib
+import time
+import queue
+import atexit
+import threading
+import multiprocessing
+import click
+from flask.cli import AppGroup
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import StandardScaler
 import json
-import requests
 from datetime import datetime, timedelta
 
 app = Flask(__name__)
@@ -24,6 +40,20 @@ if database_url.startswith('postgres://'):
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Seconds the signed session may vouch for a user's is_active/is_admin
+# flags before the access decorators look the user up again (0 = always)
+app.config['AUTH_CACHE_SECONDS'] = int(os.environ.get('AUTH_CACHE_SECONDS', 60))
+
+# Write AdminLog entries from a background thread in batches
+app.config['AUDIT_LOG_ASYNC'] = os.environ.get('AUDIT_LOG_ASYNC', 'true').lower() == 'true'
+
+# Approximate nearest-neighbour retrieval: opposite-type pools of at least
+# ANN_MIN_POOL users are narrowed to ANN_CANDIDATES before exact scoring,
+# probing ANN_PROBES clusters of the index built by `flask matches ann-index`
+app.config['ANN_MIN_POOL'] = int(os.environ.get('ANN_MIN_POOL', 50000))
+app.config['ANN_CANDIDATES'] = int(os.environ.get('ANN_CANDIDATES', 400))
+app.config['ANN_PROBES'] = int(os.environ.get('ANN_PROBES', 32))
+
 # Add JSON filter for templates
 @app.template_filter('from_json')
 def from_json_filter(value):
@@ -45,6 +75,12 @@ class User(db.Model):
     user_type = db.Column(db.String(20), nullable=False)  # 'importer', 'exporter', or 'admin'
     country = db.Column(db.String(100), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Profile version: set on registration and by /profile only, so logins and
+    # admin flag changes don't invalidate cached matching features or indexes
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # When the user's TradeMatch list was last computed; None until the
+    # first read, and again once the list is stale or settings change
+    matches_materialized_at = db.Column(db.DateTime)
     is_admin = db.Column(db.Boolean, default=False)
     is_verified = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
@@ -62,12 +98,43 @@ class User(db.Model):
     phone = db.Column(db.String(20))
     website = db.Column(db.String(200))
     
+    __table_args__ = (
+        db.Index('ix_user_created_at_id', 'created_at', 'id'),
+    )
+    
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+class UserProduct(db.Model):
+    """One product category a user trades in, normalized from User.products_services"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    
+    __table_args__ = (
+        db.Index('ix_user_product_category_user', 'category', 'user_id'),
+    )
+
+class UserCountryPreference(db.Model):
+    """One country a user prefers to trade with, normalized from User.preferred_countries"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    country = db.Column(db.String(100), primary_key=True)
+    
+    __table_args__ = (
+        db.Index('ix_user_country_preference_country_user', 'country', 'user_id'),
+    )
+
+class UserLanguage(db.Model):
+    """One language a user works in, normalized from User.languages"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    language = db.Column(db.String(50), primary_key=True)
+    
+    __table_args__ = (
+        db.Index('ix_user_language_language_user', 'language', 'user_id'),
+    )
+
 class TradeMatch(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user1_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -76,6 +143,15 @@ class TradeMatch(db.Model):
     match_reasons = db.Column(db.Text)  # JSON string of matching criteria
     status = db.Column(db.String(20), default='pending')  # pending, contacted, rejected
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_trade_match_user1_score', 'user1_id', 'compatibility_score'),
+        db.Index('ix_trade_match_created_at_id', 'created_at', 'id'),
+        db.Index('ix_trade_match_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_trade_match_user2', 'user2_id'),
+        # One row per pair, so workers materializing the same list concurrently can't duplicate it
+        db.Index('uq_trade_match_user1_user2', 'user1_id', 'user2_id', unique=True),
+    )
 
 class AdminSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -91,6 +167,10 @@ class AdminLog(db.Model):
     target_user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     details = db.Column(db.Text)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_admin_log_timestamp_id', 'timestamp', 'id'),
+    )
 
 class Document(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -161,12 +241,1377 @@ PRODUCT_CATEGORIES = {
     'services_consulting': 'Services & Consulting'
 }
 
+# Platform settings used when no AdminSettings row overrides them
+DEFAULT_SETTINGS = {
+    'platform_name': 'AfCFTA Trade Matchmaker',
+    'min_match_score': '0.3',
+    'max_matches_per_user': '10',
+    'require_verification': 'true',
+    'enable_gti_priority': 'true',
+    'maintenance_mode': 'false',
+    'semantic_weight': '0'
+}
+
+# Settings that change which matches are produced
+MATCHING_SETTINGS = ('min_match_score', 'max_matches_per_user', 'enable_gti_priority', 'semantic_weight')
+
+def _setting_bool(value):
+    return str(value).strip().lower() in ('true', '1', 'yes', 'on')
+
+class SettingsSnapshot:
+    """Immutable, typed view of the platform settings at one version"""
+    
+    def __init__(self, values, version):
+        self.values = values
+        self.version = version
+        try:
+            self.min_match_score = float(values['min_match_score'])
+        except ValueError:
+            self.min_match_score = float(DEFAULT_SETTINGS['min_match_score'])
+        try:
+            self.max_matches_per_user = max(int(values['max_matches_per_user']), 1)
+        except ValueError:
+            self.max_matches_per_user = int(DEFAULT_SETTINGS['max_matches_per_user'])
+        self.enable_gti_priority = _setting_bool(values['enable_gti_priority'])
+        try:
+            self.semantic_weight = min(max(float(values['semantic_weight']), 0.0), 1.0)
+        except ValueError:
+            self.semantic_weight = float(DEFAULT_SETTINGS['semantic_weight'])
+        self.platform_name = values['platform_name']
+        self.require_verification = _setting_bool(values['require_verification'])
+        self.maintenance_mode = _setting_bool(values['maintenance_mode'])
+    
+    def get(self, key, default=None):
+        """Raw string value of any setting, including ones without an accessor"""
+        return self.values.get(key, default)
+
+class PlatformSettings:
+    """Process-wide cache of AdminSettings
+    
+    The snapshot is loaded once and swapped on refresh(), which update()
+    calls after writing. Other workers check a cheap change stamp (row
+    count and latest updated_at) once their snapshot is older than
+    MAX_AGE and only reload when it moved, so the hot path never
+    queries AdminSettings per request.
+    """
+    
+    MAX_AGE = timedelta(seconds=60)
+    
+    def __init__(self):
+        self._snapshot = None
+        self._stamp = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _change_stamp():
+        return tuple(db.session.query(
+            db.func.count(AdminSettings.id), db.func.max(AdminSettings.updated_at)
+        ).one())
+    
+    def current(self):
+        """Return the cached snapshot, reloading it when missing or changed"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+        if datetime.utcnow() - self._loaded_at > self.MAX_AGE:
+            if self._change_stamp() != self._stamp:
+                return self.refresh()
+            self._loaded_at = datetime.utcnow()
+        return snapshot
+    
+    def refresh(self):
+        """Reload settings from the database"""
+        stamp = self._change_stamp()
+        values = dict(DEFAULT_SETTINGS)
+        for key, value in db.session.query(AdminSettings.setting_key, AdminSettings.setting_value):
+            values[key] = value
+        
+        with self._lock:
+            previous = self._snapshot
+            if previous is not None and previous.values == values:
+                snapshot = previous
+            else:
+                snapshot = SettingsSnapshot(values, previous.version + 1 if previous else 1)
+            self._snapshot = snapshot
+            self._stamp = stamp
+            self._loaded_at = datetime.utcnow()
+        return snapshot
+    
+    def update(self, values, updated_by):
+        """Write ``values`` with one upsert, commit, and return the new snapshot
+        
+        SQLite and PostgreSQL use INSERT ... ON CONFLICT (setting_key);
+        other backends fall back to updating row by row.
+        """
+        now = datetime.utcnow()
+        rows = [{
+            'setting_key': key,
+            'setting_value': str(value),
+            'updated_at': now,
+            'updated_by': updated_by
+        } for key, value in values.items()]
+        
+        upsert = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}.get(db.engine.dialect.name)
+        if rows and upsert is not None:
+            statement = upsert(AdminSettings.__table__).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=['setting_key'],
+                set_={column: statement.excluded[column] for column in ('setting_value', 'updated_at', 'updated_by')}
+            )
+            db.session.execute(statement)
+        elif rows:
+            existing = {
+                setting.setting_key: setting
+                for setting in AdminSettings.query.filter(AdminSettings.setting_key.in_(list(values)))
+            }
+            for row in rows:
+                setting = existing.get(row['setting_key'])
+                if setting is None:
+                    db.session.add(AdminSettings(**row))
+                else:
+                    setting.setting_value = row['setting_value']
+                    setting.updated_at = now
+                    setting.updated_by = updated_by
+        db.session.commit()
+        return self.refresh()
+
+platform_settings = PlatformSettings()
+
+# Company size ordinals used by the size compatibility score
+COMPANY_SIZE_ORDINALS = {
+    'micro': 1, 'small': 2, 'medium': 3, 'large': 4, 'enterprise': 5
+}
+
+# Maximum number of ids per IN (...) when loading pre-filtered candidates
+CANDIDATE_LOAD_BATCH = 500
+
+# Match reason labels
+REASON_GEOGRAPHIC = "Strong geographic alignment"
+REASON_PRODUCT = "Product category match"
+REASON_GTI = "Both in AfCFTA Guided Trade Initiative"
+
+# Number of set bits for every byte value, used to popcount packed bit rows
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def _load_json_list(value):
+    """Parse a JSON list column, returning None when it is malformed"""
+    try:
+        parsed = json.loads(value or '[]')
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(parsed, list):
+        return None
+    return parsed
+
+def _split_languages(value):
+    """Tokenize the free-text languages column exactly as the scorer compares it"""
+    return set((value or 'english').lower().split(','))
+
+class ProfileFeatures:
+    """Pre-parsed matching features of one user profile
+    
+    ``preferred_countries`` and ``products`` are None when the stored JSON
+    is malformed, which the scorers treat differently from an empty list.
+    ``product_list`` keeps the stored order for API responses.
+    """
+    
+    __slots__ = ('user_id', 'version', 'user_type', 'country', 'preferred_countries',
+                 'products', 'product_list', 'languages', 'size')
+    
+    def __init__(self, user):
+        self.user_id = user.id
+        self.version = user.updated_at
+        self.user_type = user.user_type
+        self.country = user.country
+        
+        prefs = _load_json_list(user.preferred_countries)
+        self.preferred_countries = frozenset(c for c in prefs if isinstance(c, str)) if prefs is not None else None
+        
+        products = _load_json_list(user.products_services)
+        self.product_list = tuple(products) if products is not None else ()
+        try:
+            self.products = frozenset(products) if products is not None else None
+        except TypeError:
+            self.products = None
+        
+        self.languages = frozenset(_split_languages(user.languages))
+        self.size = COMPANY_SIZE_ORDINALS.get(user.company_size, 3)
+
+# Every User column the scorer reads
+PROFILE_COLUMNS = (
+    User.id, User.user_type, User.country, User.updated_at, User.products_services,
+    User.preferred_countries, User.languages, User.company_size
+)
+
+def _profile_columns():
+    """Column-only query with every field the scorer reads
+    
+    Rows are plain tuples: no other columns are fetched and nothing enters
+    the session's identity map.
+    """
+    return User.query.with_entities(*PROFILE_COLUMNS)
+
+class ProfileFeatureCache:
+    """In-process LRU cache of ProfileFeatures keyed by user id
+    
+    Entries are versioned by ``User.updated_at`` so a profile edited in
+    another worker is re-parsed on its next lookup; the /profile handler
+    also invalidates explicitly.
+    """
+    
+    def __init__(self, maxsize=50000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, user):
+        """Return the features for a User row, parsing it on a miss"""
+        with self._lock:
+            features = self._entries.get(user.id)
+            if features is not None and features.version == user.updated_at:
+                self._entries.move_to_end(user.id)
+                self.hits += 1
+                return features
+        
+        features = ProfileFeatures(user)
+        with self._lock:
+            self.misses += 1
+            self._entries[user.id] = features
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return features
+    
+    def load(self, query):
+        """Features of every user a ``_profile_columns`` query selects, in query order
+        
+        Only ids and ``updated_at`` are read for users whose parsed
+        features are cached and current; full rows are fetched for the rest.
+        The lock is held only for the cache lookups, never while rows stream.
+        """
+        order = []
+        found = {}
+        stamps = iter(query.with_entities(User.id, User.updated_at).yield_per(CANDIDATE_LOAD_BATCH))
+        while True:
+            batch = list(islice(stamps, CANDIDATE_LOAD_BATCH))
+            if not batch:
+                break
+            with self._lock:
+                for user_id, version in batch:
+                    order.append(user_id)
+                    features = self._entries.get(user_id)
+                    if features is not None and features.version == version:
+                        self._entries.move_to_end(user_id)
+                        found[user_id] = features
+        with self._lock:
+            self.hits += len(found)
+        
+        missing = [user_id for user_id in order if user_id not in found]
+        if len(missing) * 2 > len(order):
+            rows = query.all()
+        else:
+            rows = []
+            for start in range(0, len(missing), CANDIDATE_LOAD_BATCH):
+                rows.extend(query.filter(User.id.in_(missing[start:start + CANDIDATE_LOAD_BATCH])))
+        for row in rows:
+            if row.id not in found:
+                found[row.id] = self.get(row)
+        return [found[user_id] for user_id in order if user_id in found]
+    
+    def invalidate(self, user_id):
+        """Drop the cached features of one user"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+profile_features = ProfileFeatureCache(int(os.environ.get('PROFILE_CACHE_SIZE', 50000)))
+
+class CandidateMatrix:
+    """Struct-of-arrays encoding of candidate profiles for vectorized scoring
+
+    Countries, preferred countries, product categories and languages are
+    mapped onto per-matrix vocabularies and stored as packed bit rows, so a
+    single user can be scored against every candidate with a handful of
+    NumPy operations. Scores are bit-for-bit identical to
+    ``AIMatchmaker.calculate_compatibility``.
+    
+    Built from ProfileFeatures, so no ORM objects or raw column values are
+    held while scoring.
+    """
+
+    def __init__(self, profiles):
+        profiles = list(profiles)
+        self.ids = np.array([features.user_id for features in profiles], dtype=np.int64)
+
+        country_vocab = {}
+        product_vocab = {}
+        language_vocab = {}
+
+        countries = []
+        preferences_valid = []
+        product_counts = []
+        sizes = []
+        gti = []
+        # Set bits as flat (row, code) pairs, packed once the vocabularies are complete
+        preferences = (array('i'), array('i'))
+        products = (array('i'), array('i'))
+        languages = (array('i'), array('i'))
+        for row, features in enumerate(profiles):
+            gti.append(features.country in GTI_COUNTRIES)
+            countries.append(country_vocab.setdefault(features.country, len(country_vocab)))
+
+            prefs = features.preferred_countries
+            preferences_valid.append(prefs is not None)
+            for c in prefs or ():
+                preferences[0].append(row)
+                preferences[1].append(country_vocab.setdefault(c, len(country_vocab)))
+
+            items = features.products
+            product_counts.append(len(items) if items else 0)
+            for p in items or ():
+                products[0].append(row)
+                products[1].append(product_vocab.setdefault(p, len(product_vocab)))
+
+            for l in features.languages:
+                languages[0].append(row)
+                languages[1].append(language_vocab.setdefault(l, len(language_vocab)))
+            sizes.append(features.size)
+
+        self.country_vocab = country_vocab
+        self.product_vocab = product_vocab
+        self.language_vocab = language_vocab
+
+        self.country_codes = np.array(countries, dtype=np.int32)
+        self.gti = np.array(gti, dtype=bool)
+        self.sizes = np.array(sizes, dtype=np.int8)
+
+        self.preferences_valid = np.array(preferences_valid, dtype=bool)
+        self.preference_bits = self._pack(len(profiles), preferences, len(country_vocab))
+
+        self.product_counts = np.array(product_counts, dtype=np.int32)
+        self.product_bits = self._pack(len(profiles), products, len(product_vocab))
+
+        self.language_bits = self._pack(len(profiles), languages, len(language_vocab))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _pack(n, pairs, width):
+        """Pack ``(rows, codes)`` arrays of set bits into an (n, ceil(width / 8)) uint8 bit matrix"""
+        dense = np.zeros((n, max(width, 1)), dtype=bool)
+        rows, codes = pairs
+        if len(rows):
+            dense[np.frombuffer(rows, dtype=np.intc), np.frombuffer(codes, dtype=np.intc)] = True
+        return np.packbits(dense, axis=1)
+
+    @staticmethod
+    def _pack_query(codes, width):
+        """Pack one set of vocabulary codes into a single bit row"""
+        dense = np.zeros(max(width, 1), dtype=bool)
+        if codes:
+            dense[list(codes)] = True
+        return np.packbits(dense)
+
+    def _column(self, bits, code):
+        """Return the boolean column for one vocabulary code of a packed matrix"""
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return (bits[:, code >> 3] & (0x80 >> (code & 7))) != 0
+
+    def score(self, user, gti_priority=True, semantic_weight=0.0):
+        """Score one user against every candidate
+
+        ``semantic_weight`` blends in profile text similarity from
+        ``semantic_index``. Returns ``(scores, geo_scores, product_scores,
+        gti_scores)`` as float64 arrays aligned with ``self.ids``.
+        """
+        n = len(self)
+        features = profile_features.get(user)
+
+        # 1. Geographic Compatibility
+        query_country = self.country_vocab.get(features.country)
+        query_prefs = features.preferred_countries
+        if query_country is None:
+            geo_scores = np.full(n, 0.3)
+        else:
+            geo_scores = np.where(self.country_codes != query_country, 0.3, 0.0)
+        if query_prefs is not None:
+            pref_codes = [self.country_vocab[c] for c in query_prefs if c in self.country_vocab]
+            preferred = np.isin(self.country_codes, pref_codes) & self.preferences_valid
+            prefers_query = self._column(self.preference_bits, query_country) & self.preferences_valid
+            geo_scores = geo_scores + np.where(preferred, 0.4, 0.0)
+            geo_scores = geo_scores + np.where(prefers_query, 0.4, 0.0)
+        geo_scores = np.minimum(geo_scores, 1.0)
+
+        # 2. Product/Service Compatibility
+        query_products = features.products
+        if query_products:
+            query_bits = self._pack_query(
+                [self.product_vocab[p] for p in query_products if p in self.product_vocab],
+                len(self.product_vocab)
+            )
+            intersection = _POPCOUNT_TABLE[self.product_bits & query_bits].sum(axis=1, dtype=np.int64)
+            union = self.product_counts + len(query_products) - intersection
+            product_scores = np.full(n, 0.3)
+            np.divide(intersection, union, out=product_scores, where=self.product_counts > 0)
+        else:
+            product_scores = np.full(n, 0.3)
+
+        # 3. Business Size Compatibility
+        size_scores = np.maximum(0, 1 - np.abs(self.sizes.astype(np.int64) - features.size) / 4)
+
+        # 4. Language Compatibility
+        query_languages = [self.language_vocab[l] for l in features.languages if l in self.language_vocab]
+        language_bits = self._pack_query(query_languages, len(self.language_vocab))
+        shared_language = (self.language_bits & language_bits).any(axis=1)
+        language_scores = np.where(shared_language, 1.0, 0.5)
+
+        # 5. GTI Priority Boost
+        if not gti_priority:
+            gti_scores = np.zeros(n)
+        elif features.country in GTI_COUNTRIES:
+            gti_scores = np.where(self.gti, 1.0, 0.5)
+        else:
+            gti_scores = np.where(self.gti, 0.5, 0.0)
+
+        scores = np.zeros(n)
+        scores += geo_scores * 0.3
+        scores += product_scores * 0.4
+        scores += size_scores * 0.15
+        scores += language_scores * 0.1
+        scores += gti_scores * 0.05
+        scores = np.minimum(scores, 1.0)
+
+        # 6. Semantic Similarity of profile text
+        if semantic_weight:
+            scores = scores * (1 - semantic_weight) + semantic_index.similarities(user, self.ids) * semantic_weight
+        return scores, geo_scores, product_scores, gti_scores
+
+class CandidateIndex:
+    """Inverted index from country, product category and preferred country to user ids
+    
+    Candidates are grouped into buckets by country, whether they share a
+    product category with the querying user and whether they list the
+    querying user's country as preferred. Each bucket has an upper bound
+    on the compatibility score reachable by any member (size and language
+    are assumed perfect), so whole buckets that cannot beat
+    ``min_score`` are dropped before any profile row is loaded.
+    
+    The index is built from a column-only query and kept current by
+    re-reading rows whose ``updated_at`` moved past the last sync, which
+    also picks up edits made by other workers, plus every row with an id
+    above the highest one seen, so inserts are found whatever their
+    ``updated_at``. Writes that bypass the ORM and change an existing
+    row's matching columns must also bump its ``updated_at``, or workers
+    keep indexing the old values until they restart.
+    """
+    
+    # Rows committed late by another worker can carry an updated_at just
+    # behind the watermark, so each sync re-reads this much history
+    SYNC_SLACK = timedelta(seconds=30)
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self):
+        """Forget all postings; the next lookup rebuilds from the database"""
+        self._entries = {}
+        self._by_country = {}
+        self._by_product = {}
+        self._preferred_by = {}
+        self._without_products = {}
+        self._watermark = None
+        self._max_id = 0
+        self._built = False
+    
+    @staticmethod
+    def _posting(index, user_type, key):
+        return index.setdefault(user_type, {}).setdefault(key, set())
+    
+    def _remove(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        user_type, country, products, preferred, version = entry
+        self._posting(self._by_country, user_type, country).discard(user_id)
+        for product in products:
+            self._posting(self._by_product, user_type, product).discard(user_id)
+        for pref in preferred:
+            self._posting(self._preferred_by, user_type, pref).discard(user_id)
+        self._without_products.setdefault(user_type, set()).discard(user_id)
+    
+    def _add(self, user_id, user_type, country, products_json, preferred_json, version):
+        self._remove(user_id)
+        products = _load_json_list(products_json)
+        try:
+            products = frozenset(products) if products else frozenset()
+        except TypeError:
+            products = frozenset()
+        preferred = _load_json_list(preferred_json)
+        preferred = frozenset(c for c in preferred if isinstance(c, str)) if preferred else frozenset()
+        
+        self._entries[user_id] = (user_type, country, products, preferred, version)
+        self._posting(self._by_country, user_type, country).add(user_id)
+        for product in products:
+            self._posting(self._by_product, user_type, product).add(user_id)
+        for pref in preferred:
+            self._posting(self._preferred_by, user_type, pref).add(user_id)
+        if not products:
+            self._without_products.setdefault(user_type, set()).add(user_id)
+    
+    def sync(self):
+        """Load rows created or edited since the last sync"""
+        columns = db.session.query(
+            User.id, User.user_type, User.country, User.products_services,
+            User.preferred_countries, User.updated_at
+        )
+        with self._lock:
+            if not self._built:
+                rows = columns
+            else:
+                recent = db.session.query(User.id, User.updated_at).filter(
+                    (User.id > self._max_id) | (User.updated_at >= self._watermark - self.SYNC_SLACK)
+                )
+                changed = [
+                    user_id for user_id, updated_at in recent
+                    if user_id not in self._entries or self._entries[user_id][4] != updated_at
+                ]
+                rows = []
+                for start in range(0, len(changed), CANDIDATE_LOAD_BATCH):
+                    rows.extend(columns.filter(User.id.in_(changed[start:start + CANDIDATE_LOAD_BATCH])))
+            
+            for user_id, user_type, country, products_json, preferred_json, updated_at in rows:
+                self._add(user_id, user_type, country, products_json, preferred_json, updated_at)
+                self._max_id = max(self._max_id, user_id)
+                if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+                    self._watermark = updated_at
+            if self._watermark is None:
+                self._watermark = datetime.min + self.SYNC_SLACK
+            self._built = True
+    
+    @staticmethod
+    def upper_bound(features, country, product_class, prefers_query):
+        """Highest score any candidate in a bucket can reach
+        
+        ``product_class`` is 'default' (either side has no products),
+        'overlap' or 'disjoint'. The expression mirrors the scorer's
+        evaluation order, so no candidate score exceeds it after rounding.
+        """
+        geo = 0.0
+        if country != features.country:
+            geo += 0.3
+        if features.preferred_countries is not None:
+            if country in features.preferred_countries:
+                geo += 0.4
+            if prefers_query:
+                geo += 0.4
+        geo = min(geo, 1.0)
+        
+        product = {'default': 0.3, 'overlap': 1.0, 'disjoint': 0.0}[product_class]
+        
+        if features.country in GTI_COUNTRIES and country in GTI_COUNTRIES:
+            gti = 1.0
+        elif features.country in GTI_COUNTRIES or country in GTI_COUNTRIES:
+            gti = 0.5
+        else:
+            gti = 0.0
+        
+        bound = 0.0
+        bound += geo * 0.3
+        bound += product * 0.4
+        bound += 1.0 * 0.15
+        bound += 1.0 * 0.1
+        bound += gti * 0.05
+        return min(bound, 1.0)
+    
+    def candidates(self, features, user_type, min_score):
+        """Return the ids of ``user_type`` users that may score above ``min_score``
+        
+        Returns ``(candidate_ids, pool_size)``.
+        """
+        self.sync()
+        with self._lock:
+            by_country = self._by_country.get(user_type, {})
+            pool_size = sum(len(ids) for ids in by_country.values())
+            
+            if features.preferred_countries is not None:
+                prefers_query = self._preferred_by.get(user_type, {}).get(features.country, set())
+            else:
+                prefers_query = set()
+            
+            if features.products:
+                by_product = self._by_product.get(user_type, {})
+                without_products = self._without_products.get(user_type, set())
+                overlap = set().union(*(by_product.get(p, ()) for p in features.products))
+                product_classes = ('default', 'overlap', 'disjoint')
+            else:
+                product_classes = ('default',)
+            
+            survivors = set()
+            for country, ids in by_country.items():
+                if not ids:
+                    continue
+                keep = [
+                    (product_class, prefers)
+                    for product_class in product_classes
+                    for prefers in (False, True)
+                    if self.upper_bound(features, country, product_class, prefers) > min_score
+                ]
+                if len(keep) == 2 * len(product_classes):
+                    survivors |= ids
+                    continue
+                for product_class, prefers in keep:
+                    if product_class == 'default' and len(product_classes) == 1:
+                        bucket = ids
+                    elif product_class == 'default':
+                        bucket = ids & without_products
+                    elif product_class == 'overlap':
+                        bucket = ids & overlap
+                    else:
+                        bucket = ids - overlap - without_products
+                    survivors |= (bucket & prefers_query) if prefers else (bucket - prefers_query)
+            
+            survivors.discard(features.user_id)
+            return survivors, pool_size
+
+candidate_index = CandidateIndex()
+
+# Profile text compared by the semantic score, and the TF-IDF vocabulary size
+SEMANTIC_FIELDS = ('business_description', 'certifications')
+SEMANTIC_MAX_FEATURES = 1000
+
+def _semantic_vectorizer():
+    """TfidfVectorizer configured for profile text; scikit-learn loads on first use"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(stop_words='english', max_features=SEMANTIC_MAX_FEATURES)
+
+def _current_index_version(directory):
+    """Name of the index version ``directory``/CURRENT points at, or None before the first build"""
+    try:
+        with open(os.path.join(directory, 'CURRENT')) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _new_index_version(directory):
+    """Create an empty version directory and return ``(version, path)``"""
+    version = f"{datetime.utcnow():%Y%m%d%H%M%S%f}-{os.getpid()}"
+    path = os.path.join(directory, version)
+    os.makedirs(path)
+    return version, path
+
+def _publish_index_version(directory, version, keep):
+    """Point CURRENT at ``version`` atomically and drop all but the ``keep`` newest versions"""
+    pointer = os.path.join(directory, f'CURRENT.{os.getpid()}')
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, 'CURRENT'))
+    versions = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+    for old in versions[:-keep]:
+        for name in os.listdir(os.path.join(directory, old)):
+            os.remove(os.path.join(directory, old, name))
+        os.rmdir(os.path.join(directory, old))
+
+def _locate(ids, sorted_ids):
+    """Positions of ``ids`` in the sorted array ``sorted_ids`` and a mask of those present"""
+    if not len(sorted_ids):
+        return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+    positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return positions, np.asarray(sorted_ids[positions]) == ids
+
+def _changed_ids(rows, ids, versions, overlay):
+    """Ids among ``(id, updated_at)`` rows not indexed at that version
+    
+    ``ids`` and ``versions`` are the sorted stored arrays; ``overlay`` maps
+    ids edited since the build to entries whose last item is their version.
+    """
+    if not rows:
+        return []
+    positions, stored = _locate(np.array([row[0] for row in rows], dtype=np.int64), ids)
+    changed = []
+    for (user_id, updated_at), position, present in zip(rows, positions.tolist(), stored.tolist()):
+        if user_id in overlay:
+            indexed = overlay[user_id][-1]
+        elif present:
+            indexed = versions[position]
+        else:
+            changed.append(user_id)
+            continue
+        if indexed != np.datetime64(updated_at, 'us'):
+            changed.append(user_id)
+    return changed
+
+class SemanticIndex:
+    """TF-IDF vectors of profile text, persisted as memory-mapped .npy arrays
+    
+    The vectorizer is fitted by ``flask matches semantic-index`` and the
+    L2-normalized document vectors are written as CSR arrays into a new
+    version directory that every worker maps read-only. Requests never
+    fit; until the first build every similarity is 0.
+    Profiles edited after the fit are re-vectorized with the stored
+    vocabulary into an in-memory overlay, synced by ``updated_at`` like
+    CandidateIndex. Similarity to every candidate is one sparse
+    matrix-vector product; a single pair is one row lookup.
+    """
+    
+    SYNC_SLACK = CandidateIndex.SYNC_SLACK
+    SYNC_INTERVAL = timedelta(seconds=5)
+    KEEP_VERSIONS = 2
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self.pinned = False  # Set while forked workers share the index
+        self._lock = threading.Lock()
+        self._analyzer = None
+        self.reset()
+    
+    def reset(self):
+        """Forget the loaded index and overlay; the next use reloads from disk"""
+        self._version = None
+        self._vocabulary = None
+        self._idf = None
+        self._ids = None
+        self._versions = None
+        self._matrix = None
+        self._overlay = {}
+        self._overlay_ids = np.zeros(0, dtype=np.int64)
+        self._overlay_matrix = None
+        self._watermark = None
+        self._synced_at = None
+    
+    @property
+    def version(self):
+        """Name of the loaded index version, or None"""
+        return self._version
+    
+    @property
+    def vocabulary_size(self):
+        return len(self._idf) if self._idf is not None else 0
+    
+    def _load(self, version):
+        from scipy.sparse import csr_matrix
+        path = os.path.join(self.directory, version)
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self._vocabulary = meta['vocabulary']
+        self._idf = np.load(os.path.join(path, 'idf.npy'))
+        self._ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode='r')
+        self._versions = np.load(os.path.join(path, 'versions.npy'), mmap_mode='r')
+        arrays = [np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in ('data', 'indices', 'indptr')]
+        self._matrix = csr_matrix(tuple(arrays), shape=(len(self._ids), len(self._idf)), copy=False)
+        self._overlay = {}
+        self._rebuild_overlay()
+        self._watermark = datetime.fromisoformat(meta['watermark']) if meta['watermark'] else datetime.min + self.SYNC_SLACK
+        self._version = version
+        self._synced_at = None
+    
+    def fit(self):
+        """Fit the vectorizer on every profile and write a new index version"""
+        os.makedirs(self.directory, exist_ok=True)
+        rows = db.session.query(User.id, User.updated_at, *(getattr(User, f) for f in SEMANTIC_FIELDS)).order_by(User.id).all()
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        documents = [self._text(row) for row in rows]
+        watermark = max((row[1] for row in rows if row[1] is not None), default=None)
+        
+        vectorizer = _semantic_vectorizer()
+        try:
+            matrix = vectorizer.fit_transform(documents).tocsr()
+            vocabulary = {term: int(column) for term, column in vectorizer.vocabulary_.items()}
+            idf = vectorizer.idf_
+        except ValueError:  # No profile has any indexable text yet
+            from scipy.sparse import csr_matrix
+            matrix = csr_matrix((len(rows), 0))
+            vocabulary, idf = {}, np.zeros(0)
+        matrix.sort_indices()
+        
+        version, path = _new_index_version(self.directory)
+        np.save(os.path.join(path, 'ids.npy'), ids)
+        np.save(os.path.join(path, 'versions.npy'), np.array([row[1] for row in rows], dtype='datetime64[us]'))
+        np.save(os.path.join(path, 'idf.npy'), idf.astype(np.float64))
+        np.save(os.path.join(path, 'data.npy'), matrix.data.astype(np.float32))
+        np.save(os.path.join(path, 'indices.npy'), matrix.indices.astype(np.int32))
+        np.save(os.path.join(path, 'indptr.npy'), matrix.indptr.astype(np.int64))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'vocabulary': vocabulary, 'watermark': watermark.isoformat() if watermark else None}, f)
+        
+        _publish_index_version(self.directory, version, self.KEEP_VERSIONS)
+        with self._lock:
+            self._load(version)
+        return len(ids), len(vocabulary)
+    
+    def ensure_ready(self):
+        """Load the newest index version and sync edits; False when none has been built
+        
+        Both the CURRENT pointer and the edits are checked at most once per
+        SYNC_INTERVAL, so a version published by another worker is picked
+        up within that interval.
+        """
+        if self.pinned:
+            return self._version is not None
+        synced_at = self._synced_at
+        if self._version is not None and synced_at is not None and datetime.utcnow() - synced_at <= self.SYNC_INTERVAL:
+            return True
+        version = _current_index_version(self.directory)
+        if version is None:
+            return False
+        with self._lock:
+            if version != self._version:
+                self._load(version)
+            if self._synced_at is None or datetime.utcnow() - self._synced_at > self.SYNC_INTERVAL:
+                self._sync()
+        return True
+    
+    def _sync(self):
+        recent = db.session.query(User.id, User.updated_at).filter(
+            User.updated_at >= self._watermark - self.SYNC_SLACK
+        ).all()
+        changed = _changed_ids(recent, self._ids, self._versions, self._overlay)
+        columns = db.session.query(User.id, User.updated_at, *(getattr(User, f) for f in SEMANTIC_FIELDS))
+        for start in range(0, len(changed), CANDIDATE_LOAD_BATCH):
+            for row in columns.filter(User.id.in_(changed[start:start + CANDIDATE_LOAD_BATCH])):
+                self._overlay[row[0]] = self._transform(self._text(row)) + (np.datetime64(row[1], 'us'),)
+        self._watermark = max([self._watermark] + [updated_at for _, updated_at in recent if updated_at is not None])
+        if changed:
+            self._rebuild_overlay()
+        self._synced_at = datetime.utcnow()
+    
+    def update(self, user):
+        """Re-vectorize one edited profile right away in this worker"""
+        if self._version is None:
+            return
+        with self._lock:
+            self._overlay[user.id] = self._transform(self._text(user)) + (np.datetime64(user.updated_at, 'us'),)
+            self._rebuild_overlay()
+    
+    def _rebuild_overlay(self):
+        from scipy.sparse import csr_matrix
+        ids = np.array(sorted(self._overlay), dtype=np.int64)
+        indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        indices = []
+        data = []
+        for i, user_id in enumerate(ids.tolist()):
+            columns, values, _ = self._overlay[user_id]
+            indices.append(columns)
+            data.append(values)
+            indptr[i + 1] = indptr[i] + len(columns)
+        self._overlay_ids = ids
+        self._overlay_matrix = csr_matrix((
+            np.concatenate(data) if data else np.zeros(0, dtype=np.float32),
+            np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+            indptr
+        ), shape=(len(ids), len(self._idf)))
+    
+    @staticmethod
+    def _text(profile):
+        return ' '.join(getattr(profile, field, None) or '' for field in SEMANTIC_FIELDS)
+    
+    def _transform(self, text):
+        """Sparse TF-IDF vector ``(columns, values)`` of one text, as the fitted vectorizer would produce"""
+        if self._analyzer is None:
+            self._analyzer = _semantic_vectorizer().build_analyzer()
+        columns = [self._vocabulary[t] for t in self._analyzer(text) if t in self._vocabulary]
+        columns, counts = np.unique(np.array(columns, dtype=np.int32), return_counts=True)
+        values = counts * self._idf[columns]
+        norm = np.sqrt(np.dot(values, values))
+        if norm > 0:
+            values = values / norm
+        return columns.astype(np.int32), values.astype(np.float32)
+    
+    def _row(self, user_id):
+        """Sparse vector ``(columns, values)`` of an indexed profile, or None"""
+        if user_id in self._overlay:
+            return self._overlay[user_id][:2]
+        position = np.searchsorted(self._ids, user_id)
+        if position < len(self._ids) and self._ids[position] == user_id:
+            start, end = self._matrix.indptr[position], self._matrix.indptr[position + 1]
+            return self._matrix.indices[start:end], self._matrix.data[start:end]
+        return None
+    
+    def _query_row(self, user):
+        """Sparse vector of ``user``, from the overlay, the stored index or their text"""
+        row = self._row(user.id)
+        if row is None and any(hasattr(user, field) for field in SEMANTIC_FIELDS):
+            row = self._transform(self._text(user))
+        return row
+    
+    def _query_vector(self, user):
+        """Dense vector of ``user``, from the overlay, the stored index or their text"""
+        vector = np.zeros(len(self._idf))
+        row = self._query_row(user)
+        if row is not None:
+            columns, values = row
+            vector[columns] = values
+        return vector
+    
+    def similarities(self, user, candidate_ids):
+        """Cosine similarity of ``user`` to each id in ``candidate_ids``, in [0, 1]"""
+        result = np.zeros(len(candidate_ids))
+        if not self.ensure_ready():
+            return result
+        with self._lock:
+            query = self._query_vector(user)
+            positions, stored = _locate(candidate_ids, self._ids)
+            if stored.any():
+                result[stored] = (self._matrix @ query)[positions[stored]]
+            positions, edited = _locate(candidate_ids, self._overlay_ids)
+            if edited.any():
+                result[edited] = (self._overlay_matrix @ query)[positions[edited]]
+        return np.clip(result, 0.0, 1.0)
+    
+    def similarity(self, user, candidate_id):
+        """Cosine similarity of ``user`` to one candidate, equal to ``similarities`` for that id"""
+        if not self.ensure_ready():
+            return 0.0
+        with self._lock:
+            query = self._query_row(user)
+            row = self._row(candidate_id)
+        if query is None or row is None:
+            return 0.0
+        # Summed in the candidate's column order in float64, as the matrix-vector product does
+        weights = dict(zip(query[0].tolist(), query[1].tolist()))
+        similarity = 0.0
+        for column, value in zip(row[0].tolist(), row[1].tolist()):
+            if column in weights:
+                similarity += value * weights[column]
+        return min(max(similarity, 0.0), 1.0)
+    
+    def project(self, ids, projection):
+        """TF-IDF vectors of ``ids`` multiplied by ``projection``; rows of unknown ids are zero"""
+        result = np.zeros((len(ids), projection.shape[1]), dtype=np.float32)
+        if not self.ensure_ready():
+            return result
+        with self._lock:
+            positions, stored = _locate(ids, self._ids)
+            if stored.any():
+                result[stored] = self._matrix[positions[stored]] @ projection
+            positions, edited = _locate(ids, self._overlay_ids)
+            if edited.any():
+                result[edited] = self._overlay_matrix[positions[edited]] @ projection
+        return result
+    
+    def project_query(self, user, projection):
+        """TF-IDF vector of ``user`` multiplied by ``projection``"""
+        if not self.ensure_ready():
+            return np.zeros(projection.shape[1], dtype=np.float32)
+        with self._lock:
+            return (self._query_vector(user) @ projection).astype(np.float32)
+
+semantic_index = SemanticIndex(os.environ.get('SEMANTIC_INDEX_DIR', os.path.join(app.instance_path, 'semantic_index')))
+
+# Dense profile embedding of the ANN index
+ANN_LANGUAGE_BUCKETS = 16
+ANN_TEXT_DIMENSIONS = 32
+ANN_PROJECTION_SEED = 7
+_ANN_COUNTRY_SLOTS = {country: i for i, country in enumerate(AFCFTA_COUNTRIES)}
+_ANN_PRODUCT_SLOTS = {product: i for i, product in enumerate(PRODUCT_CATEGORIES)}
+
+def _language_bucket(language):
+    return zlib.crc32(language.encode('utf-8')) % ANN_LANGUAGE_BUCKETS
+
+class AnnIndex:
+    """Inverted-file (IVF) index over dense profile embeddings
+    
+    Each profile is embedded as one-hot country, preferred countries,
+    product categories, size, hashed languages, GTI membership and a
+    random projection of its TF-IDF text vector. The query embedding is
+    weighted so that its inner product with a candidate approximates the
+    compatibility score, so the candidates with the largest inner product
+    are the likely top matches.
+    
+    Embeddings of each user type are clustered with k-means; a search
+    probes the ANN_PROBES clusters whose centroids score highest and
+    returns the best ANN_CANDIDATES members for exact re-ranking. Like
+    SemanticIndex the clusters are persisted as memory-mapped .npy
+    arrays, and profiles edited after the build are embedded into an
+    in-memory overlay and assigned to their nearest cluster.
+    """
+    
+    SYNC_SLACK = CandidateIndex.SYNC_SLACK
+    SYNC_INTERVAL = timedelta(seconds=5)
+    KEEP_VERSIONS = 2
+    KMEANS_ITERATIONS = 10
+    KMEANS_SAMPLE_PER_LIST = 64
+    USER_TYPES = ('importer', 'exporter')
+    
+    # Embedding layout; the last country slot holds countries outside AFCFTA_COUNTRIES
+    COUNTRY_SLOTS = len(AFCFTA_COUNTRIES) + 1
+    COUNTRY = 0
+    PREFERRED = COUNTRY + COUNTRY_SLOTS
+    PRODUCTS = PREFERRED + COUNTRY_SLOTS
+    NO_PRODUCTS = PRODUCTS + len(PRODUCT_CATEGORIES)
+    SIZE = NO_PRODUCTS + 1
+    LANGUAGES = SIZE + len(COMPANY_SIZE_ORDINALS)
+    GTI = LANGUAGES + ANN_LANGUAGE_BUCKETS
+    TEXT = GTI + 1
+    DIMENSIONS = TEXT + ANN_TEXT_DIMENSIONS
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._projection_matrix = None
+        self.reset()
+    
+    def reset(self):
+        """Forget the loaded index and overlay; the next use reloads from disk"""
+        self._version = None
+        self._lists = {}
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._versions = np.zeros(0, dtype='datetime64[us]')
+        self._semantic_version = None
+        self._vocabulary_size = 0
+        self._overlay = {}
+        self._overlay_ids = np.zeros(0, dtype=np.int64)
+        self._overlay_by_type = {}
+        self._watermark = None
+        self._synced_at = None
+    
+    def _country_slot(self, country):
+        return _ANN_COUNTRY_SLOTS.get(country, self.COUNTRY_SLOTS - 1)
+    
+    def _projection(self):
+        """Fixed random projection of the TF-IDF vocabulary onto ANN_TEXT_DIMENSIONS"""
+        if self._projection_matrix is None or self._projection_matrix.shape[0] != self._vocabulary_size:
+            rng = np.random.default_rng(ANN_PROJECTION_SEED)
+            projection = rng.standard_normal((self._vocabulary_size, ANN_TEXT_DIMENSIONS)) / np.sqrt(ANN_TEXT_DIMENSIONS)
+            self._projection_matrix = projection.astype(np.float32)
+        return self._projection_matrix
+    
+    def _text_vectors(self, ids):
+        """Projected TF-IDF rows of ``ids``, or None when the text index changed since the build"""
+        if self._semantic_version is None:
+            return None
+        semantic_index.ensure_ready()
+        if semantic_index.version != self._semantic_version:
+            return None
+        return semantic_index.project(ids, self._projection())
+    
+    def _embed(self, profiles, text=None):
+        """Candidate-side embeddings of ProfileFeatures as an (n, DIMENSIONS) float32 array"""
+        vectors = np.zeros((len(profiles), self.DIMENSIONS), dtype=np.float32)
+        for row, features in zip(vectors, profiles):
+            row[self.COUNTRY + self._country_slot(features.country)] = 1
+            for country in features.preferred_countries or ():
+                row[self.PREFERRED + self._country_slot(country)] = 1
+            if features.products:
+                slots = [_ANN_PRODUCT_SLOTS[p] for p in features.products if p in _ANN_PRODUCT_SLOTS]
+                row[[self.PRODUCTS + slot for slot in slots]] = 1 / np.sqrt(len(features.products))
+            else:
+                row[self.NO_PRODUCTS] = 1
+            row[self.SIZE + features.size - 1] = 1
+            for language in features.languages:
+                row[self.LANGUAGES + _language_bucket(language)] = 1
+            row[self.GTI] = features.country in GTI_COUNTRIES
+        if text is not None:
+            vectors[:, self.TEXT:] = text
+        return vectors
+    
+    def _query_vector(self, features, gti_priority, semantic_weight, text=None):
+        """Query-side embedding whose inner product with ``_embed`` rows approximates the score"""
+        query = np.zeros(self.DIMENSIONS, dtype=np.float32)
+        
+        # Geographic: +0.4 per preference either way, 0.3 unless same country
+        own_country = self._country_slot(features.country)
+        query[self.COUNTRY + own_country] -= 0.3 * 0.3
+        if features.preferred_countries is not None:
+            for country in features.preferred_countries:
+                query[self.COUNTRY + self._country_slot(country)] += 0.3 * 0.4
+            query[self.PREFERRED + own_country] += 0.3 * 0.4
+        
+        # Products: cosine stands in for Jaccard; candidates without products score 0.3
+        if features.products:
+            slots = [_ANN_PRODUCT_SLOTS[p] for p in features.products if p in _ANN_PRODUCT_SLOTS]
+            query[[self.PRODUCTS + slot for slot in slots]] = 0.4 / np.sqrt(len(features.products))
+            query[self.NO_PRODUCTS] = 0.4 * 0.3
+        
+        sizes = np.arange(1, len(COMPANY_SIZE_ORDINALS) + 1)
+        query[self.SIZE:self.LANGUAGES] = 0.15 * np.maximum(0, 1 - np.abs(sizes - features.size) / 4)
+        for language in features.languages:
+            query[self.LANGUAGES + _language_bucket(language)] = 0.1 * 0.5
+        if gti_priority:
+            query[self.GTI] = 0.05 * 0.5
+        
+        query[:self.TEXT] *= 1 - semantic_weight
+        if text is not None:
+            query[self.TEXT:] = text * semantic_weight
+        return query
+    
+    @staticmethod
+    def _assign(vectors, centroids, batch=65536):
+        """Index of the nearest centroid (L2) of every row"""
+        centroid_norms = (centroids * centroids).sum(axis=1)
+        assignment = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), batch):
+            distances = centroid_norms - 2 * (vectors[start:start + batch] @ centroids.T)
+            assignment[start:start + batch] = distances.argmin(axis=1)
+        return assignment
+    
+    def _kmeans(self, vectors, lists, rng):
+        sample_size = min(len(vectors), lists * self.KMEANS_SAMPLE_PER_LIST)
+        sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, lists, replace=False)].copy()
+        for _ in range(self.KMEANS_ITERATIONS):
+            assignment = self._assign(sample, centroids)
+            counts = np.bincount(assignment, minlength=lists)
+            filled = counts > 0  # Empty clusters keep their previous centroid
+            for dimension in range(vectors.shape[1]):
+                sums = np.bincount(assignment, weights=sample[:, dimension], minlength=lists)
+                centroids[filled, dimension] = sums[filled] / counts[filled]
+        return centroids
+    
+    def _load(self, version):
+        path = os.path.join(self.directory, version)
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self._lists = {}
+        for user_type in meta['user_types']:
+            self._lists[user_type] = tuple(
+                np.load(os.path.join(path, f'{user_type}-{name}.npy'), mmap_mode=None if name == 'centroids' else 'r')
+                for name in ('centroids', 'offsets', 'ids', 'vectors')
+            )
+        self._ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode='r')
+        self._versions = np.load(os.path.join(path, 'versions.npy'), mmap_mode='r')
+        self._semantic_version = meta['semantic_version']
+        self._vocabulary_size = meta['vocabulary_size']
+        self._overlay = {}
+        self._rebuild_overlay()
+        self._watermark = datetime.fromisoformat(meta['watermark']) if meta['watermark'] else datetime.min + self.SYNC_SLACK
+        self._version = version
+        self._synced_at = None
+    
+    def fit(self):
+        """Embed and cluster every importer and exporter, and write a new index version
+        
+        Returns ``(documents, lists)`` totals over both user types.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        # Without a text index the embedding leaves its text dimensions at zero
+        self._semantic_version = semantic_index.version if semantic_index.ensure_ready() else None
+        self._vocabulary_size = semantic_index.vocabulary_size
+        
+        version, path = _new_index_version(self.directory)
+        rng = np.random.default_rng(ANN_PROJECTION_SEED)
+        watermark = None
+        documents = 0
+        total_lists = 0
+        versions = {}
+        for user_type in self.USER_TYPES:
+            rows = _profile_columns().filter(User.user_type == user_type).order_by(User.id).all()
+            ids = np.array([row.id for row in rows], dtype=np.int64)
+            versions.update((row.id, row.updated_at) for row in rows)
+            vectors = self._embed([ProfileFeatures(row) for row in rows], self._text_vectors(ids))
+            for row in rows:
+                if row.updated_at is not None and (watermark is None or row.updated_at > watermark):
+                    watermark = row.updated_at
+            
+            lists = max(1, int(np.sqrt(len(rows)))) if len(rows) else 0
+            if lists:
+                centroids = self._kmeans(vectors, lists, rng)
+                assignment = self._assign(vectors, centroids)
+            else:
+                centroids = np.zeros((0, self.DIMENSIONS), dtype=np.float32)
+                assignment = np.zeros(0, dtype=np.int32)
+            order = np.argsort(assignment, kind='stable')
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=lists))]).astype(np.int64)
+            
+            np.save(os.path.join(path, f'{user_type}-centroids.npy'), centroids)
+            np.save(os.path.join(path, f'{user_type}-offsets.npy'), offsets)
+            np.save(os.path.join(path, f'{user_type}-ids.npy'), ids[order])
+            np.save(os.path.join(path, f'{user_type}-vectors.npy'), vectors[order])
+            documents += len(rows)
+            total_lists += lists
+        
+        # Every indexed id with the version embedded, for skipping unchanged rows on sync
+        indexed = sorted(versions)
+        np.save(os.path.join(path, 'ids.npy'), np.array(indexed, dtype=np.int64))
+        np.save(os.path.join(path, 'versions.npy'), np.array([versions[i] for i in indexed], dtype='datetime64[us]'))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({
+                'user_types': list(self.USER_TYPES),
+                'semantic_version': self._semantic_version,
+                'vocabulary_size': self._vocabulary_size,
+                'watermark': watermark.isoformat() if watermark else None
+            }, f)
+        
+        _publish_index_version(self.directory, version, self.KEEP_VERSIONS)
+        with self._lock:
+            self._load(version)
+        return documents, total_lists
+    
+    def ensure_ready(self):
+        """Load the newest index version and sync edits; False when none has been built"""
+        version = _current_index_version(self.directory)
+        if version is None:
+            return False
+        with self._lock:
+            if version != self._version:
+                self._load(version)
+            if self._synced_at is None or datetime.utcnow() - self._synced_at > self.SYNC_INTERVAL:
+                self._sync()
+        return True
+    
+    def _add_to_overlay(self, profiles, text):
+        vectors = self._embed(profiles, text)
+        for features, vector in zip(profiles, vectors):
+            lists = self._lists.get(features.user_type)
+            list_no = int(self._assign(vector[None, :], lists[0])[0]) if lists is not None and len(lists[0]) else 0
+            self._overlay[features.user_id] = (features.user_type, list_no, vector, np.datetime64(features.version, 'us'))
+        self._rebuild_overlay()
+    
+    def _sync(self):
+        recent = db.session.query(User.id, User.updated_at).filter(
+            User.updated_at >= self._watermark - self.SYNC_SLACK,
+            User.user_type.in_(self.USER_TYPES)
+        ).all()
+        changed = _changed_ids(recent, self._ids, self._versions, self._overlay)
+        rows = []
+        for start in range(0, len(changed), CANDIDATE_LOAD_BATCH):
+            rows.extend(_profile_columns().filter(User.id.in_(changed[start:start + CANDIDATE_LOAD_BATCH])))
+        if rows:
+            self._add_to_overlay(
+                [ProfileFeatures(row) for row in rows],
+                self._text_vectors(np.array([row.id for row in rows], dtype=np.int64))
+            )
+        self._watermark = max([self._watermark] + [updated_at for _, updated_at in recent if updated_at is not None])
+        self._synced_at = datetime.utcnow()
+    
+    def update(self, user):
+        """Re-embed one edited profile right away in this worker"""
+        if self._version is None:
+            return
+        with self._lock:
+            self._add_to_overlay(
+                [profile_features.get(user)],
+                self._text_vectors(np.array([user.id], dtype=np.int64))
+            )
+    
+    def _rebuild_overlay(self):
+        self._overlay_ids = np.array(sorted(self._overlay), dtype=np.int64)
+        self._overlay_by_type = {}
+        for user_type in self.USER_TYPES:
+            members = [(user_id, list_no, vector) for user_id, (entry_type, list_no, vector, _) in self._overlay.items()
+                       if entry_type == user_type]
+            self._overlay_by_type[user_type] = (
+                np.array([m[0] for m in members], dtype=np.int64),
+                np.array([m[1] for m in members], dtype=np.int32),
+                np.array([m[2] for m in members], dtype=np.float32).reshape(len(members), self.DIMENSIONS)
+            )
+    
+    def search(self, user, k):
+        """Ids of up to ``k`` opposite-type users likely to score highest against ``user``
+        
+        Returns None when no index has been built or the pool is smaller
+        than ANN_MIN_POOL, in which case callers score the pool exhaustively.
+        """
+        if not self.ensure_ready():
+            return None
+        settings = platform_settings.current()
+        user_type = 'exporter' if user.user_type == 'importer' else 'importer'
+        text = None
+        if settings.semantic_weight and self._semantic_version is not None:
+            semantic_index.ensure_ready()
+            if semantic_index.version == self._semantic_version:
+                text = semantic_index.project_query(user, self._projection())
+        query = self._query_vector(profile_features.get(user), settings.enable_gti_priority,
+                                   settings.semantic_weight, text)
+        
+        with self._lock:
+            if user_type not in self._lists:
+                return None
+            centroids, offsets, ids, vectors = self._lists[user_type]
+            overlay_ids, overlay_lists, overlay_vectors = self._overlay_by_type[user_type]
+            if len(ids) + len(overlay_ids) < app.config['ANN_MIN_POOL']:
+                return None
+            
+            probes = np.argsort(-(centroids @ query), kind='stable')[:app.config['ANN_PROBES']]
+            found_ids = [ids[offsets[p]:offsets[p + 1]] for p in probes]
+            found_ids = np.concatenate(found_ids) if found_ids else np.zeros(0, dtype=np.int64)
+            found_scores = np.concatenate([vectors[offsets[p]:offsets[p + 1]] @ query for p in probes]) if len(probes) else np.zeros(0)
+            live = ~np.isin(found_ids, self._overlay_ids)  # Edited since the build; the overlay has them
+            found_ids, found_scores = found_ids[live], found_scores[live]
+            
+            probed = np.isin(overlay_lists, probes) if len(centroids) else np.ones(len(overlay_ids), dtype=bool)
+            found_ids = np.concatenate([found_ids, overlay_ids[probed]]).astype(np.int64)
+            found_scores = np.concatenate([found_scores, overlay_vectors[probed] @ query])
+        
+        keep = found_ids != user.id
+        found_ids, found_scores = found_ids[keep], found_scores[keep]
+        if len(found_ids) > k:
+            top = np.argpartition(-found_scores, k - 1)[:k]
+            found_ids = found_ids[top]
+        return found_ids
+
+ann_index = AnnIndex(os.environ.get('ANN_INDEX_DIR', os.path.join(app.instance_path, 'ann_index')))
+
+def select_top_k(scores, ids, k, after=None):
+    """Return the indices of the ``k`` best entries, ordered by score desc then id asc
+    
+    Uses ``np.partition`` so only the boundary score is found in linear
+    time; entries tied on it are admitted by ascending id, which keeps
+    pages deterministic. ``after`` is a ``(score, id)`` cursor and limits
+    the selection to entries ranked strictly below it.
+    """
+    positions = np.arange(len(scores))
+    if after is not None:
+        after_score, after_id = after
+        positions = positions[(scores < after_score) | ((scores == after_score) & (ids > after_id))]
+    if k <= 0 or len(positions) == 0:
+        return positions[:0]
+    
+    if len(positions) > k:
+        boundary = -np.partition(-scores[positions], k - 1)[k - 1]
+        above = positions[scores[positions] > boundary]
+        tied = positions[scores[positions] == boundary]
+        tied = tied[np.argsort(ids[tied], kind='stable')][:k - len(above)]
+        positions = np.concatenate([above, tied])
+    
+    return positions[np.lexsort((ids[positions], -scores[positions]))]
+
+def encode_match_cursor(match):
+    """Opaque paging cursor pointing just after a match"""
+    return _match_cursor(match['score'], match['user'].id)
+
+def _match_cursor(score, user_id):
+    return f"{float(score).hex()}:{user_id}"
+
+def decode_match_cursor(cursor):
+    """Parse a paging cursor into ``(score, user_id)``, or None if malformed"""
+    try:
+        score, user_id = cursor.split(':')
+        return float.fromhex(score), int(user_id)
+    except (AttributeError, ValueError):
+        return None
+
 class AIMatchmaker:
     """AI-powered trade matchmaking engine for AfCFTA"""
     
+    # Ranked matches kept per user so /api/matches can page without rescoring
+    PAGE_WINDOW = 500
+    PAGE_TTL = timedelta(minutes=2)
+    PAGE_CACHE_SIZE = 1024
+    
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
-        self.scaler = StandardScaler()
+        self._pages = OrderedDict()
+        self._pages_lock = threading.Lock()
+    
+    @staticmethod
+    def _match_reasons(geo_score, product_score, gti_score):
+        """Build the human readable reasons for a scored pair"""
+        reasons = []
+        if geo_score > 0.7:
+            reasons.append(REASON_GEOGRAPHIC)
+        if product_score > 0.6:
+            reasons.append(REASON_PRODUCT)
+        if gti_score > 0:
+            reasons.append(REASON_GTI)
+        return reasons
     
     def calculate_compatibility(self, user1, user2):
         """Calculate compatibility score between two users"""
@@ -174,19 +1619,14 @@ class AIMatchmaker:
             return 0.0  # Same type users don't match
         
         score = 0.0
-        reasons = []
         
         # 1. Geographic Compatibility (30% weight)
         geo_score = self._calculate_geographic_score(user1, user2)
         score += geo_score * 0.3
-        if geo_score > 0.7:
-            reasons.append(f"Strong geographic alignment")
         
         # 2. Product/Service Compatibility (40% weight)
         product_score = self._calculate_product_score(user1, user2)
         score += product_score * 0.4
-        if product_score > 0.6:
-            reasons.append(f"Product category match")
         
         # 3. Business Size Compatibility (15% weight)
         size_score = self._calculate_size_score(user1, user2)
@@ -197,12 +1637,22 @@ class AIMatchmaker:
         score += lang_score * 0.1
         
         # 5. GTI Priority Boost (5% weight)
-        gti_score = self._calculate_gti_score(user1, user2)
+        if platform_settings.current().enable_gti_priority:
+            gti_score = self._calculate_gti_score(user1, user2)
+        else:
+            gti_score = 0.0
         score += gti_score * 0.05
-        if gti_score > 0:
-            reasons.append("Both in AfCFTA Guided Trade Initiative")
         
-        return min(score, 1.0), reasons
+        score = min(score, 1.0)
+        
+        # 6. Semantic Similarity of profile text (configurable weight)
+        semantic_weight = platform_settings.current().semantic_weight
+        if semantic_weight:
+            similarity = semantic_index.similarity(user1, user2.id)
+            score = score * (1 - semantic_weight) + similarity * semantic_weight
+        
+        reasons = self._match_reasons(geo_score, product_score, gti_score)
+        return score, reasons
     
     def _calculate_geographic_score(self, user1, user2):
         """Calculate geographic compatibility"""
@@ -213,68 +1663,48 @@ class AIMatchmaker:
             score += 0.3
         
         # Check preferred countries
-        try:
-            user1_prefs = json.loads(user1.preferred_countries or '[]')
-            user2_prefs = json.loads(user2.preferred_countries or '[]')
-            
+        user1_prefs = profile_features.get(user1).preferred_countries
+        user2_prefs = profile_features.get(user2).preferred_countries
+        if user1_prefs is not None and user2_prefs is not None:
             if user2.country in user1_prefs:
                 score += 0.4
             if user1.country in user2_prefs:
                 score += 0.4
-        except:
-            pass
         
         return min(score, 1.0)
     
     def _calculate_product_score(self, user1, user2):
         """Calculate product/service compatibility"""
-        try:
-            user1_products = set(json.loads(user1.products_services or '[]'))
-            user2_products = set(json.loads(user2.products_services or '[]'))
-            
-            if not user1_products or not user2_products:
-                return 0.3  # Default score if no product data
-            
-            # Calculate intersection
-            intersection = len(user1_products.intersection(user2_products))
-            union = len(user1_products.union(user2_products))
-            
-            if union > 0:
-                return intersection / union
-            
-        except:
-            pass
+        user1_products = profile_features.get(user1).products
+        user2_products = profile_features.get(user2).products
         
-        return 0.3
+        if not user1_products or not user2_products:
+            return 0.3  # Default score if no product data
+        
+        # Calculate intersection
+        intersection = len(user1_products.intersection(user2_products))
+        union = len(user1_products.union(user2_products))
+        
+        return intersection / union
     
     def _calculate_size_score(self, user1, user2):
         """Calculate business size compatibility"""
-        size_mapping = {
-            'micro': 1, 'small': 2, 'medium': 3, 'large': 4, 'enterprise': 5
-        }
+        size1 = profile_features.get(user1).size
+        size2 = profile_features.get(user2).size
         
-        try:
-            size1 = size_mapping.get(user1.company_size, 3)
-            size2 = size_mapping.get(user2.company_size, 3)
-            
-            # Compatible if within 2 levels
-            diff = abs(size1 - size2)
-            return max(0, 1 - diff / 4)
-        except:
-            return 0.7  # Default compatibility
+        # Compatible if within 2 levels
+        diff = abs(size1 - size2)
+        return max(0, 1 - diff / 4)
     
     def _calculate_language_score(self, user1, user2):
         """Calculate language compatibility"""
-        try:
-            lang1 = set((user1.languages or 'english').lower().split(','))
-            lang2 = set((user2.languages or 'english').lower().split(','))
-            
-            if lang1.intersection(lang2):
-                return 1.0
-            else:
-                return 0.5  # English default
-        except:
-            return 0.7
+        lang1 = profile_features.get(user1).languages
+        lang2 = profile_features.get(user2).languages
+        
+        if lang1.intersection(lang2):
+            return 1.0
+        else:
+            return 0.5  # English default
     
     def _calculate_gti_score(self, user1, user2):
         """Boost score for GTI countries"""
@@ -284,37 +1714,235 @@ class AIMatchmaker:
             return 0.5
         return 0.0
     
-    def find_matches(self, user_id, limit=10):
-        """Find top matches for a user"""
-        current_user = User.query.get(user_id)
-        if not current_user:
-            return []
+    def score_candidates(self, current_user, min_score=None, prefilter=True, restrict_to=None):
+        """Score a user against opposite-type users in a single vectorized pass
+        
+        With ``prefilter`` the candidate index drops users that cannot score
+        above ``min_score`` (the min_match_score setting by default) before
+        their rows are loaded. ``restrict_to`` limits scoring to the given
+        ids, e.g. those retrieved by ``ann_index``.
+        
+        Returns ``(candidates, scores, geo_scores, product_scores, gti_scores)``
+        or None when there are no candidates.
+        """
+        settings = platform_settings.current()
+        if min_score is None:
+            min_score = settings.min_match_score
         
-        # Get potential matches (opposite user type)
         opposite_type = 'exporter' if current_user.user_type == 'importer' else 'importer'
-        potential_matches = User.query.filter(
+        # Candidates load as cached ProfileFeatures; find_matches hydrates the top-K
+        query = _profile_columns().filter(
             User.user_type == opposite_type,
-            User.id != user_id
-        ).all()
+            User.id != current_user.id
+        )
         
-        matches = []
-        for potential_match in potential_matches:
-            score, reasons = self.calculate_compatibility(current_user, potential_match)
-            if score > 0.3:  # Minimum threshold
-                matches.append({
-                    'user': potential_match,
-                    'score': score,
-                    'reasons': reasons
-                })
+        if prefilter:
+            # The index bounds the structured score; text similarity can add
+            # up to semantic_weight, so prune against the matching threshold
+            weight = settings.semantic_weight
+            structured_min = (min_score - weight) / (1 - weight) - 1e-9 if weight < 1 else -1.0
+            candidate_ids, pool_size = candidate_index.candidates(
+                profile_features.get(current_user), opposite_type, structured_min
+            )
+            if restrict_to is not None:
+                candidate_ids &= set(restrict_to.tolist())
+            if len(candidate_ids) * 2 > pool_size:
+                # Most of the pool survived; one scan beats many IN (...) batches
+                potential_matches = [
+                    f for f in profile_features.load(query.order_by(User.id)) if f.user_id in candidate_ids
+                ]
+            else:
+                candidate_ids = sorted(candidate_ids)
+                potential_matches = []
+                for start in range(0, len(candidate_ids), CANDIDATE_LOAD_BATCH):
+                    batch = candidate_ids[start:start + CANDIDATE_LOAD_BATCH]
+                    potential_matches.extend(profile_features.load(query.filter(User.id.in_(batch)).order_by(User.id)))
+        elif restrict_to is not None:
+            restrict_to = np.sort(restrict_to).tolist()
+            potential_matches = []
+            for start in range(0, len(restrict_to), CANDIDATE_LOAD_BATCH):
+                batch = restrict_to[start:start + CANDIDATE_LOAD_BATCH]
+                potential_matches.extend(profile_features.load(query.filter(User.id.in_(batch)).order_by(User.id)))
+        else:
+            potential_matches = profile_features.load(query.order_by(User.id))
+        
+        if not potential_matches:
+            return None
+        
+        candidates = CandidateMatrix(potential_matches)
+        return (candidates,) + candidates.score(current_user, settings.enable_gti_priority, settings.semantic_weight)
+    
+    def _ranked_window(self, user_id, min_score, prefilter, after=None, approximate=False, exclude=None):
+        """Score a user and keep the best PAGE_WINDOW matches ranked
+        
+        Returns ``(ids, scores, geo_scores, product_scores, gti_scores, complete)``
+        arrays; ``complete`` is False when more matches exist past the window.
+        With ``approximate`` the first window only re-ranks the candidates
+        ``ann_index`` retrieves; it is never complete, so paging past it
+        ranks the rest of the pool exactly.
+        """
+        current_user = User.query.get(user_id)
+        if current_user and approximate and after is None:
+            retrieved = ann_index.search(current_user, app.config['ANN_CANDIDATES'])
+            if retrieved is not None:
+                window = self._rank(current_user, min_score, prefilter, None, retrieved, exclude)
+                if len(window[0]):
+                    return window[:5] + (False,)
+        return self._rank(current_user, min_score, prefilter, after, exclude=exclude)
+    
+    def _rank(self, current_user, min_score, prefilter, after, restrict_to=None, exclude=None):
+        scored = self.score_candidates(current_user, min_score, prefilter, restrict_to) if current_user else None
+        if scored is None:
+            empty = np.zeros(0)
+            return np.zeros(0, dtype=np.int64), empty, empty, empty, empty, True
+        candidates, scores, geo_scores, product_scores, gti_scores = scored
         
-        # Sort by score and return top matches
-        matches.sort(key=lambda x: x['score'], reverse=True)
-        return matches[:limit]
+        eligible = np.flatnonzero(scores > min_score)  # Minimum threshold
+        if exclude:
+            eligible = eligible[~np.isin(candidates.ids[eligible], list(exclude))]
+        top = select_top_k(scores[eligible], candidates.ids[eligible], self.PAGE_WINDOW, after)
+        complete = len(top) < self.PAGE_WINDOW
+        top = eligible[top]
+        return candidates.ids[top], scores[top], geo_scores[top], product_scores[top], gti_scores[top], complete
+    
+    def find_matches(self, user_id, limit=None, min_score=None, prefilter=True, offset=0, cursor=None,
+                     approximate=True, exclude=None):
+        """Find top matches for a user
+        
+        ``limit`` and ``min_score`` default to the max_matches_per_user and
+        min_match_score settings. Pages past the first are served by
+        ``offset`` or a ``cursor`` from ``encode_match_cursor``; they reuse
+        the ranking computed for the first page for up to PAGE_TTL instead
+        of rescoring. ``approximate`` lets large pools be narrowed by
+        ``ann_index`` before exact scoring. Candidate ids in ``exclude``
+        are never returned.
+        """
+        return list(self.iter_matches(self.ranked_page(
+            user_id, limit, min_score, prefilter, offset, cursor, approximate, exclude
+        )))
+    
+    def ranked_page(self, user_id, limit=None, min_score=None, prefilter=True, offset=0, cursor=None,
+                    approximate=True, exclude=None):
+        """Rank one page as for ``find_matches`` without loading any User row
+        
+        Returns ``(ids, scores, geo_scores, product_scores, gti_scores)``
+        arrays in rank order. Raises ValueError for a cursor that does not
+        decode, rather than serving the first page again.
+        """
+        settings = platform_settings.current()
+        if limit is None:
+            limit = settings.max_matches_per_user
+        if min_score is None:
+            min_score = settings.min_match_score
+        after = decode_match_cursor(cursor) if cursor else None
+        if cursor and after is None:
+            raise ValueError(f'Malformed match cursor: {cursor!r}')
+        
+        exclude = frozenset(exclude or ())
+        key = (user_id, min_score, prefilter, approximate, exclude, settings.version)
+        window = None
+        if offset or cursor:
+            with self._pages_lock:
+                cached = self._pages.get(key)
+                if cached is not None and datetime.utcnow() - cached[0] < self.PAGE_TTL:
+                    self._pages.move_to_end(key)
+                    window = cached[1]
+        if window is None:
+            window = self._ranked_window(user_id, min_score, prefilter, approximate=approximate, exclude=exclude)
+            with self._pages_lock:
+                self._pages[key] = (datetime.utcnow(), window)
+                self._pages.move_to_end(key)
+                while len(self._pages) > self.PAGE_CACHE_SIZE:
+                    self._pages.popitem(last=False)
+        ids, scores, geo_scores, product_scores, gti_scores, complete = window
+        
+        start = offset
+        if after is not None:
+            ranked_after = (scores < after[0]) | ((scores == after[0]) & (ids > after[1]))
+            if ranked_after.any():
+                start += int(np.argmax(ranked_after))
+            elif complete:
+                start += len(ids)
+            else:
+                # The cursor points past the cached window: rank from it directly
+                ids, scores, geo_scores, product_scores, gti_scores, complete = self._ranked_window(
+                    user_id, min_score, prefilter, after, exclude=exclude
+                )
+        
+        while start + limit > len(ids) and not complete:
+            # Paging past the ranked window: rank the next slice
+            deeper = self._ranked_window(user_id, min_score, prefilter, (scores[-1], ids[-1]), exclude=exclude)
+            ids, scores, geo_scores, product_scores, gti_scores = (
+                np.concatenate([a, b]) for a, b in zip(
+                    (ids, scores, geo_scores, product_scores, gti_scores), deeper[:5]
+                )
+            )
+            complete = deeper[5]
+        
+        page = slice(start, start + limit)
+        return ids[page], scores[page], geo_scores[page], product_scores[page], gti_scores[page]
+    
+    def iter_matches(self, page):
+        """Yield the match dicts of a ``ranked_page``, loading User rows in batches
+        
+        ``products`` is the parsed products_services list cached by scoring.
+        """
+        ids, scores, geo_scores, product_scores, gti_scores = page
+        page_ids = ids.tolist()
+        for start in range(0, len(page_ids), CANDIDATE_LOAD_BATCH):
+            batch = page_ids[start:start + CANDIDATE_LOAD_BATCH]
+            users = {u.id: u for u in User.query.filter(User.id.in_(batch))}
+            for i, candidate_id in enumerate(batch, start):
+                if candidate_id not in users:
+                    continue
+                user = users[candidate_id]
+                yield {
+                    'user': user,
+                    'score': float(scores[i]),
+                    'reasons': self._match_reasons(geo_scores[i], product_scores[i], gti_scores[i]),
+                    'products': list(profile_features.get(user).product_list)
+                }
 
 # Initialize AI Matchmaker
 ai_matcher = AIMatchmaker()
 
 # Admin Helper Functions
+def get_current_user():
+    """The signed-in User, loaded at most once per request and kept on flask.g"""
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    user = g.get('current_user')
+    if user is None or user.id != user_id:
+        user = g.current_user = db.session.get(User, user_id)
+    return user
+
+def remember_access(user):
+    """Record the user's access flags in the signed session"""
+    session['access'] = {
+        'user_id': user.id,
+        'is_active': bool(user.is_active),
+        'is_admin': bool(user.is_admin),
+        'checked_at': time.time()
+    }
+    return session['access']
+
+def current_access():
+    """Access flags of the signed-in user, or None if they no longer exist
+    
+    Flags cached in the session are trusted for AUTH_CACHE_SECONDS, so
+    requests that only need a permission check skip the User lookup;
+    changes to a user's flags take effect once the cache expires.
+    """
+    access = session.get('access')
+    if (access and access.get('user_id') == session.get('user_id') and
+            time.time() - access.get('checked_at', 0) < app.config['AUTH_CACHE_SECONDS']):
+        return access
+    user = get_current_user()
+    if user is None:
+        return None
+    return remember_access(user)
+
 def admin_required(f):
     """Decorator to require admin access"""
     from functools import wraps
@@ -322,8 +1950,8 @@ def admin_required(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return redirect(url_for('login'))
-        user = User.query.get(session['user_id'])
-        if not user or not user.is_admin:
+        access = current_access()
+        if not access or not access['is_admin']:
             return redirect(url_for('dashboard'))
         return f(*args, **kwargs)
     return decorated_function
@@ -335,39 +1963,168 @@ def login_required(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return redirect(url_for('login'))
-        user = User.query.get(session['user_id'])
-        if not user or not user.is_active:
+        access = current_access()
+        if not access or not access['is_active']:
             session.clear()
             return redirect(url_for('login'))
         return f(*args, **kwargs)
     return decorated_function
 
+class AuditLogWriter:
+    """Buffers AdminLog entries and bulk-inserts them off the request path
+    
+    A daemon thread flushes the buffer every FLUSH_INTERVAL seconds, or
+    sooner once BATCH_SIZE entries are waiting. flush() writes everything
+    buffered so far and is also called before audit logs are read and at
+    interpreter exit. When disabled or the buffer is full, entries are
+    written synchronously in the caller's session.
+    """
+    
+    BATCH_SIZE = 200
+    FLUSH_INTERVAL = 1.0
+    MAX_PENDING = 10000
+    
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=self.MAX_PENDING)
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+    
+    def log(self, admin_id, action, target_user_id=None, details=None):
+        self.log_many(admin_id, action, [(target_user_id, details)])
+    
+    def log_many(self, admin_id, action, targets):
+        """Record one ``action`` entry per ``(target_user_id, details)`` pair"""
+        now = datetime.utcnow()
+        entries = [{
+            'admin_id': admin_id,
+            'action': action,
+            'target_user_id': target_user_id,
+            'details': details,
+            'timestamp': now
+        } for target_user_id, details in targets]
+        
+        if app.config['AUDIT_LOG_ASYNC'] and not self._closed and self._ensure_thread():
+            while entries:
+                try:
+                    self._queue.put_nowait(entries[0])
+                except queue.Full:
+                    break
+                entries.pop(0)
+            if self._queue.qsize() >= self.BATCH_SIZE:
+                self._wakeup.set()
+        
+        if entries:
+            db.session.add_all(AdminLog(**entry) for entry in entries)
+            db.session.commit()
+    
+    def flush(self):
+        """Write every buffered entry with one bulk insert
+        
+        If the bulk insert fails, entries are written one at a time so a
+        single bad entry cannot hold back the rest; entries that fail on
+        their own are logged and dropped. Only when the database is
+        unavailable are the remaining entries kept for the next flush.
+        """
+        with self._flush_lock:
+            entries = []
+            while True:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not entries:
+                return 0
+            try:
+                with app.app_context(), db.engine.begin() as connection:
+                    connection.execute(AdminLog.__table__.insert(), entries)
+                return len(entries)
+            except Exception:
+                app.logger.exception('Failed to bulk insert %d audit log entries; writing them one by one', len(entries))
+            
+            written = 0
+            for position, entry in enumerate(entries):
+                try:
+                    with app.app_context(), db.engine.begin() as connection:
+                        connection.execute(AdminLog.__table__.insert(), [entry])
+                except db.exc.OperationalError:
+                    app.logger.exception('Database unavailable; retrying %d audit log entries later', len(entries) - position)
+                    self._requeue(entries[position:])
+                    break
+                except Exception:
+                    app.logger.exception('Dropped %s audit log entry that cannot be written: %r', entry['action'], entry)
+                else:
+                    written += 1
+            return written
+    
+    def _requeue(self, entries):
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                app.logger.error('Audit log buffer full; dropped %s entry', entry['action'])
+    
+    def close(self):
+        """Stop the background thread and write what is left"""
+        self._closed = True
+        if self._thread is not None and self._pid == os.getpid():
+            self._wakeup.set()
+            self._thread.join(timeout=5)
+        self.flush()
+    
+    def _ensure_thread(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return True
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                if self._pid is not None:
+                    # Forked: the parent still owns its buffered entries
+                    self._queue = queue.Queue(maxsize=self.MAX_PENDING)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+        return True
+    
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.FLUSH_INTERVAL)
+            self._wakeup.clear()
+            self.flush()
+
+audit_log = AuditLogWriter()
+atexit.register(audit_log.close)
+
 def log_admin_action(admin_id, action, target_user_id=None, details=None):
     """Log admin actions for audit trail"""
-    log = AdminLog(
-        admin_id=admin_id,
-        action=action,
-        target_user_id=target_user_id,
-        details=details
-    )
-    db.session.add(log)
-    db.session.commit()
+    audit_log.log(admin_id, action, target_user_id, details)
 
-def get_platform_metrics():
-    """Get platform analytics metrics"""
-    total_users = User.query.filter(User.user_type != 'admin').count()
-    total_importers = User.query.filter_by(user_type='importer').count()
-    total_exporters = User.query.filter_by(user_type='exporter').count()
-    verified_users = User.query.filter(User.is_verified == True, User.user_type != 'admin').count()
-    active_users = User.query.filter(User.is_active == True, User.user_type != 'admin').count()
-    total_matches = TradeMatch.query.count()
-    successful_connections = TradeMatch.query.filter_by(status='contacted').count()
+def _count_where(condition):
+    """SUM(CASE WHEN condition THEN 1 ELSE 0 END), for conditional aggregates"""
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+def _compute_platform_metrics():
+    """Aggregate platform metrics with one query per table"""
+    non_admin = User.user_type != 'admin'
+    (total_users, total_importers, total_exporters,
+     verified_users, active_users, gti_users) = db.session.query(
+        _count_where(non_admin),
+        _count_where(User.user_type == 'importer'),
+        _count_where(User.user_type == 'exporter'),
+        _count_where(db.and_(User.is_verified == True, non_admin)),
+        _count_where(db.and_(User.is_active == True, non_admin)),
+        _count_where(db.and_(User.country.in_(GTI_COUNTRIES), non_admin))
+    ).one()
+    
+    total_matches, successful_connections = db.session.query(
+        db.func.count(TradeMatch.id),
+        _count_where(TradeMatch.status == 'contacted')
+    ).one()
     
     # Country distribution
-    country_stats = db.session.query(User.country, db.func.count(User.id)).filter(User.user_type != 'admin').group_by(User.country).all()
-    
-    # GTI vs Non-GTI users
-    gti_users = User.query.filter(User.country.in_(GTI_COUNTRIES), User.user_type != 'admin').count()
+    country_stats = db.session.query(User.country, db.func.count(User.id)).filter(non_admin).group_by(User.country).all()
     
     return {
         'total_users': total_users,
@@ -383,6 +2140,704 @@ def get_platform_metrics():
         'success_rate': (successful_connections / total_matches * 100) if total_matches > 0 else 0
     }
 
+class PlatformMetricsCache:
+    """Process-wide TTL cache for get_platform_metrics
+    
+    Registration, admin user actions and match status changes call
+    invalidate(); anything else (e.g. lazily materialized matches) is
+    picked up once the cached metrics are older than TTL.
+    """
+    
+    TTL = timedelta(seconds=30)
+    
+    def __init__(self):
+        self._metrics = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+    
+    def get(self):
+        """Return cached metrics, recomputing them when missing or expired"""
+        with self._lock:
+            metrics = self._metrics
+            if metrics is not None and datetime.utcnow() - self._loaded_at <= self.TTL:
+                return metrics
+        
+        metrics = _compute_platform_metrics()
+        with self._lock:
+            self._metrics = metrics
+            self._loaded_at = datetime.utcnow()
+        return metrics
+    
+    def invalidate(self):
+        """Force the next get() to recompute"""
+        with self._lock:
+            self._metrics = None
+
+platform_metrics = PlatformMetricsCache()
+
+class DashboardCounters:
+    """In-memory user counters shown on every /dashboard view
+    
+    Counts are adjusted in place as users register and reconciled against
+    the database every RECONCILE_INTERVAL, which also picks up rows
+    written by other workers, the CLI or create_sample_data.py.
+    """
+    
+    RECONCILE_INTERVAL = timedelta(minutes=5)
+    
+    def __init__(self):
+        self._counts = None
+        self._reconciled_at = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _user_counts(user_type, country):
+        return {
+            'total_users': 1,
+            'importers': int(user_type == 'importer'),
+            'exporters': int(user_type == 'exporter'),
+            'gti_users': int(country in GTI_COUNTRIES)
+        }
+    
+    def snapshot(self):
+        """Return a copy of the counters, reconciling them when stale"""
+        with self._lock:
+            if self._counts is not None and datetime.utcnow() - self._reconciled_at <= self.RECONCILE_INTERVAL:
+                return dict(self._counts)
+        return self.reconcile()
+    
+    def reconcile(self):
+        """Recount users with a single aggregate query"""
+        total_users, importers, exporters, gti_users = db.session.query(
+            db.func.count(User.id),
+            _count_where(User.user_type == 'importer'),
+            _count_where(User.user_type == 'exporter'),
+            _count_where(User.country.in_(GTI_COUNTRIES))
+        ).one()
+        counts = {
+            'total_users': total_users,
+            'importers': importers,
+            'exporters': exporters,
+            'gti_users': gti_users
+        }
+        with self._lock:
+            self._counts = counts
+            self._reconciled_at = datetime.utcnow()
+        return dict(counts)
+    
+    def user_added(self, user):
+        """Count a newly committed user without querying"""
+        with self._lock:
+            if self._counts is None:
+                return
+            for key, value in self._user_counts(user.user_type, user.country).items():
+                self._counts[key] += value
+
+dashboard_counters = DashboardCounters()
+
+def get_platform_metrics():
+    """Get platform analytics metrics"""
+    return platform_metrics.get()
+
+# Users per batch when backfilling the normalized profile tables
+PROFILE_BACKFILL_BATCH = 5000
+
+def _product_categories(value):
+    """Distinct category keys in a products_services JSON column"""
+    return {product for product in _load_json_list(value) or [] if isinstance(product, str)}
+
+def _preferred_country_names(value):
+    """Distinct countries in a preferred_countries JSON column"""
+    return {country for country in _load_json_list(value) or [] if isinstance(country, str)}
+
+def _language_names(value):
+    """Lower-cased languages in the free-text languages column
+    
+    Empty values default to English, as they do in the matcher.
+    """
+    return {language.strip() for language in _split_languages(value)} - {''}
+
+# (table, value column, User column it is derived from, parser)
+NORMALIZED_PROFILE_FIELDS = (
+    (UserProduct, 'category', 'products_services', _product_categories),
+    (UserCountryPreference, 'country', 'preferred_countries', _preferred_country_names),
+    (UserLanguage, 'language', 'languages', _language_names)
+)
+
+def sync_user_profile_tables(user):
+    """Replace a user's normalized profile rows with their current profile columns"""
+    for model, column, source, parse in NORMALIZED_PROFILE_FIELDS:
+        model.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        db.session.add_all(
+            model(user_id=user.id, **{column: value})
+            for value in sorted(parse(getattr(user, source)))
+        )
+
+def backfill_profile_tables():
+    """Create normalized profile rows for users that have none stored yet
+    
+    Covers existing databases and rows inserted outside the ORM routes
+    (create_sample_data.py, bulk imports). Returns the number of rows added.
+    """
+    added = 0
+    for model, column, source, parse in NORMALIZED_PROFILE_FIELDS:
+        source_column = getattr(User, source)
+        last_id = 0
+        while True:
+            batch = db.session.query(User.id, source_column).filter(
+                User.id > last_id,
+                ~db.exists().where(model.user_id == User.id)
+            ).order_by(User.id).limit(PROFILE_BACKFILL_BATCH).all()
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            
+            rows = [
+                {'user_id': user_id, column: value}
+                for user_id, raw in batch
+                for value in sorted(parse(raw))
+            ]
+            if rows:
+                db.session.execute(model.__table__.insert(), rows)
+            db.session.commit()
+            added += len(rows)
+    return added
+
+def query_users(user_type=None, prefers_country=None, language=None, product=None):
+    """Build a User query filtered through the normalized profile tables
+    
+    e.g. query_users('importer', prefers_country='Ghana', language='french')
+    Each criterion is an indexed semi-join on its (value, user_id) index.
+    """
+    query = User.query
+    if user_type is not None:
+        query = query.filter(User.user_type == user_type)
+    if prefers_country is not None:
+        query = query.filter(User.id.in_(
+            db.select(UserCountryPreference.user_id).where(UserCountryPreference.country == prefers_country)
+        ))
+    if language is not None:
+        query = query.filter(User.id.in_(
+            db.select(UserLanguage.user_id).where(UserLanguage.language == language.strip().lower())
+        ))
+    if product is not None:
+        query = query.filter(User.id.in_(
+            db.select(UserProduct.user_id).where(UserProduct.category == product)
+        ))
+    return query
+
+# User columns shown next to a match in admin listings
+MATCH_LISTING_USER_COLUMNS = ('id', 'company_name', 'email', 'country', 'user_type', 'is_verified')
+
+def match_listing_query(status=None):
+    """Query ``(TradeMatch, user1, user2)`` rows for the admin match listings
+    
+    Each side is joined once through its own alias and only loads
+    MATCH_LISTING_USER_COLUMNS; callers add the ordering.
+    """
+    user1 = aliased(User, name='user1')
+    user2 = aliased(User, name='user2')
+    query = db.session.query(TradeMatch, user1, user2).join(
+        user1, TradeMatch.user1_id == user1.id
+    ).join(
+        user2, TradeMatch.user2_id == user2.id
+    ).options(
+        load_only(*(getattr(user1, column) for column in MATCH_LISTING_USER_COLUMNS)),
+        load_only(*(getattr(user2, column) for column in MATCH_LISTING_USER_COLUMNS))
+    )
+    if status is not None:
+        query = query.filter(TradeMatch.status == status)
+    return query
+
+# Statuses a TradeMatch can be in
+MATCH_STATUSES = ('pending', 'contacted', 'rejected')
+
+def match_status_counts():
+    """Count matches per status with one GROUP BY
+    
+    Returns ``total`` plus a count for every MATCH_STATUSES entry; the
+    (status, created_at, id) index lets this scan the index alone.
+    """
+    counts = dict.fromkeys(MATCH_STATUSES, 0)
+    counts.update(db.session.query(TradeMatch.status, db.func.count()).group_by(TradeMatch.status).all())
+    return {'total': sum(counts.values()), **{status: counts[status] for status in MATCH_STATUSES}}
+
+# ==================== KEYSET PAGINATION ====================
+
+# Rows counted at most when an approximate total is requested
+APPROX_COUNT_CAP = 10000
+
+class KeysetPage:
+    """One page of a keyset-paginated list, newest first"""
+    
+    def __init__(self, items, per_page, next_cursor, total=None, total_is_estimate=False):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+def encode_keyset_cursor(timestamp, row_id):
+    """Opaque cursor pointing just after the row with this (timestamp, id)"""
+    return f"{timestamp.isoformat()}_{row_id}"
+
+def decode_keyset_cursor(cursor):
+    """Parse a keyset cursor into ``(timestamp, id)``, or None if malformed"""
+    try:
+        timestamp, row_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+def keyset_paginate(query, timestamp_column, id_column, per_page, cursor=None, with_total=False, row_key=None):
+    """Page through ``query`` by (timestamp, id) descending without OFFSET
+    
+    Each page is an index range scan starting after ``cursor``, so deep
+    pages cost the same as the first. ``row_key`` maps a result row to its
+    (timestamp, id) when the query returns tuples. The optional total is
+    capped at APPROX_COUNT_CAP rows so it also stays bounded.
+    """
+    total = None
+    total_is_estimate = False
+    if with_total:
+        total = db.session.query(db.func.count()).select_from(
+            query.order_by(None).with_entities(id_column).limit(APPROX_COUNT_CAP + 1).subquery()
+        ).scalar()
+        if total > APPROX_COUNT_CAP:
+            total, total_is_estimate = APPROX_COUNT_CAP, True
+    
+    position = decode_keyset_cursor(cursor) if cursor else None
+    if position is not None:
+        timestamp, row_id = position
+        query = query.filter(
+            (timestamp_column < timestamp) |
+            ((timestamp_column == timestamp) & (id_column < row_id))
+        )
+    rows = query.order_by(None).order_by(timestamp_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_keyset_cursor(*(row_key or (lambda row: (row.created_at, row.id)))(rows[-1]))
+    return KeysetPage(rows, per_page, next_cursor, total, total_is_estimate)
+
+def wants_keyset_page():
+    """Admin lists switch to keyset pagination when a ``cursor`` argument is given
+    
+    An empty ``?cursor=`` requests the first page; ``?count=1`` adds the
+    approximate total.
+    """
+    return request.args.get('cursor') is not None
+
+# ==================== USER SEARCH ====================
+
+# Columns covered by full-text search, with their ranking weights
+SEARCH_COLUMNS = ('company_name', 'email', 'country', 'business_description')
+SEARCH_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+# Terms beyond this are ignored
+SEARCH_MAX_TERMS = 8
+
+# 'fts5' (SQLite), 'tsvector' (PostgreSQL) or None for LIKE matching;
+# set by create_search_index() or detected on first search
+search_backend = None
+_search_backend_known = False
+
+def create_search_index():
+    """Create the full-text index over SEARCH_COLUMNS and keep it in sync
+    
+    SQLite gets an external-content FTS5 table maintained by triggers on
+    "user"; PostgreSQL gets a generated tsvector column with a GIN index.
+    Both tokenize on non-alphanumerics so search terms split the same way.
+    Other backends, or SQLite builds without FTS5, keep LIKE matching.
+    """
+    global search_backend, _search_backend_known
+    _search_backend_known = True
+    columns = ', '.join(SEARCH_COLUMNS)
+    dialect = db.engine.dialect.name
+    
+    if dialect == 'sqlite':
+        new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+        old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+        triggers = {
+            'user_search_ai': f"""AFTER INSERT ON "user" BEGIN
+                INSERT INTO user_search(rowid, {columns}) VALUES (new.id, {new_values});
+            END""",
+            'user_search_ad': f"""AFTER DELETE ON "user" BEGIN
+                INSERT INTO user_search(user_search, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            END""",
+            'user_search_au': f"""AFTER UPDATE OF {columns} ON "user" BEGIN
+                INSERT INTO user_search(user_search, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO user_search(rowid, {columns}) VALUES (new.id, {new_values});
+            END"""
+        }
+        try:
+            with db.engine.begin() as connection:
+                existing = set(connection.execute(db.text(
+                    "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'user_search_%'"
+                )).scalars())
+                connection.execute(db.text(
+                    f"""CREATE VIRTUAL TABLE IF NOT EXISTS user_search USING fts5(
+                        {columns}, content='user', content_rowid='id'
+                    )"""
+                ))
+                for name, body in triggers.items():
+                    connection.execute(db.text(f'CREATE TRIGGER IF NOT EXISTS {name} {body}'))
+                # New index, or "user" was recreated and lost its triggers
+                if existing != set(triggers):
+                    connection.execute(db.text("INSERT INTO user_search(user_search) VALUES ('rebuild')"))
+        except db.exc.OperationalError:
+            search_backend = None  # SQLite built without FTS5
+        else:
+            search_backend = 'fts5'
+    
+    elif dialect == 'postgresql':
+        document = " || ' ' || ".join(
+            f"setweight(to_tsvector('simple', regexp_replace(coalesce({column}, ''), '[^[:alnum:]]+', ' ', 'g')), '{weight}')"
+            for column, weight in zip(SEARCH_COLUMNS, 'ABCD')
+        )
+        with db.engine.begin() as connection:
+            connection.execute(db.text(
+                f'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS search_vector tsvector '
+                f'GENERATED ALWAYS AS ({document}) STORED'
+            ))
+            connection.execute(db.text(
+                'CREATE INDEX IF NOT EXISTS ix_user_search_vector ON "user" USING GIN (search_vector)'
+            ))
+        search_backend = 'tsvector'
+    
+    else:
+        search_backend = None
+    return search_backend
+
+def detect_search_backend():
+    """The full-text index create_search_index() built in this database"""
+    global search_backend, _search_backend_known
+    if not _search_backend_known:
+        inspector = db.inspect(db.engine)
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite' and inspector.has_table('user_search'):
+            search_backend = 'fts5'
+        elif dialect == 'postgresql' and 'search_vector' in {
+            column['name'] for column in inspector.get_columns('user')
+        }:
+            search_backend = 'tsvector'
+        else:
+            search_backend = None
+        _search_backend_known = True
+    return search_backend
+
+def search_users(query, text):
+    """Filter a User query by a free-text search, best matches first
+    
+    Every term must match a word in one of SEARCH_COLUMNS; the last term
+    also matches as a prefix, so partially typed words find results.
+    Without a full-text backend this falls back to substring matching.
+    """
+    terms = re.findall(r'[^\W_]+', text.lower())[:SEARCH_MAX_TERMS]
+    backend = detect_search_backend()
+    
+    if terms and backend == 'fts5':
+        weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+        hits = db.select(
+            db.literal_column('rowid').label('user_id'),
+            db.literal_column(f'bm25(user_search, {weights})').label('rank')
+        ).select_from(db.table('user_search')).where(
+            db.text('user_search MATCH :search_terms').bindparams(
+                search_terms=' '.join(f'"{term}"' for term in terms) + '*'
+            )
+        ).subquery()
+        # bm25() is lower for better matches
+        return query.join(hits, hits.c.user_id == User.id).order_by(hits.c.rank)
+    
+    if terms and backend == 'tsvector':
+        vector = db.literal_column('"user".search_vector')
+        ts_query = db.func.to_tsquery('simple', ' & '.join(terms) + ':*')
+        return query.filter(vector.op('@@')(ts_query)).order_by(db.func.ts_rank(vector, ts_query).desc())
+    
+    return query.filter(
+        (User.company_name.contains(text)) |
+        (User.email.contains(text)) |
+        (User.country.contains(text))
+    )
+
+# ==================== MATCH MATERIALIZATION ====================
+
+# Largest page /api/matches will return
+API_MATCHES_MAX_LIMIT = 100
+# Larger pages are allowed when /api/matches streams NDJSON
+API_MATCHES_STREAM_MAX_LIMIT = 1000
+
+def mark_matches_materialized(owner_ids, materialized=True):
+    """Record that the owners' stored lists are current, or clear the mark so their next read recomputes them"""
+    value = datetime.utcnow() if materialized else None
+    owner_ids = sorted(owner_ids)
+    for start in range(0, len(owner_ids), CANDIDATE_LOAD_BATCH):
+        User.query.filter(User.id.in_(owner_ids[start:start + CANDIDATE_LOAD_BATCH])).update(
+            {User.matches_materialized_at: value}, synchronize_session=False
+        )
+
+def insert_trade_matches(rows):
+    """Bulk insert TradeMatch rows, skipping pairs another worker stored first
+    
+    SQLite and PostgreSQL use INSERT ... ON CONFLICT DO NOTHING; other
+    backends insert plainly and rely on the unique index to reject races.
+    """
+    if not rows:
+        return
+    insert = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}.get(db.engine.dialect.name)
+    if insert is None:
+        db.session.execute(TradeMatch.__table__.insert(), rows)
+    else:
+        db.session.execute(
+            insert(TradeMatch.__table__).on_conflict_do_nothing(index_elements=['user1_id', 'user2_id']), rows
+        )
+
+def materialize_matches(user_id, limit=None):
+    """Recompute and store the top pending matches for one user
+    
+    Pending rows are upserted by candidate so unchanged matches keep their
+    created_at; rows a user has acted on (contacted/rejected) are never
+    touched and their candidates are not offered again.
+    """
+    if limit is None:
+        limit = platform_settings.current().max_matches_per_user
+    
+    rows = TradeMatch.query.filter_by(user1_id=user_id).all()
+    pending = {row.user2_id: row for row in rows if row.status == 'pending'}
+    acted_on = {row.user2_id for row in rows if row.status != 'pending'}
+    
+    matches = [
+        m for m in ai_matcher.find_matches(user_id, limit=limit + len(acted_on))
+        if m['user'].id not in acted_on
+    ][:limit]
+    
+    inserts = []
+    for match in matches:
+        candidate_id = match['user'].id
+        row = pending.pop(candidate_id, None)
+        if row is None:
+            inserts.append({
+                'user1_id': user_id,
+                'user2_id': candidate_id,
+                'compatibility_score': match['score'],
+                'match_reasons': json.dumps(match['reasons'])
+            })
+        else:
+            row.compatibility_score = match['score']
+            row.match_reasons = json.dumps(match['reasons'])
+    
+    for row in pending.values():
+        db.session.delete(row)
+    db.session.flush()
+    insert_trade_matches(inserts)
+    mark_matches_materialized([user_id])
+    db.session.commit()
+    return matches
+
+def refresh_affected_matches(user_id, limit=None):
+    """Refresh stored matches after a user registers or edits their profile
+    
+    The user's own list is recomputed. Compatibility is symmetric, so one
+    vectorized pass also yields the user's score for every counterpart,
+    which is enough to patch their stored lists in place:
+    
+    - a pending row for the user is rescored while the user still ranks
+      above the rest of that list, and dropped when the user falls below
+      min_match_score on a list that was not full;
+    - lists the user now enters get one row inserted and the lowest
+      pending row trimmed.
+    
+    Lists whose new order can't be decided from the stored rows alone (the
+    user fell below a full list's floor, or tied it) lose their pending
+    rows and their materialized mark, so they are rematerialized on their
+    owner's next read or by ``flask matches rebuild``. Users whose list was
+    never materialized are likewise left to their next read.
+    """
+    user = User.query.get(user_id)
+    if not user:
+        return
+    
+    settings = platform_settings.current()
+    if limit is None:
+        limit = settings.max_matches_per_user
+    
+    materialize_matches(user_id, limit)
+    
+    holding = {}
+    acted_on = set()  # Owners who contacted or rejected the user are never offered them again
+    for row in TradeMatch.query.filter_by(user2_id=user_id):
+        if row.status == 'pending':
+            holding[row.user1_id] = row
+        else:
+            acted_on.add(row.user1_id)
+    
+    scored = ai_matcher.score_candidates(user)
+    qualifying = []
+    if scored is not None:
+        candidates, scores, geo_scores, product_scores, gti_scores = scored
+        qualifying = candidates.ids[scores > settings.min_match_score].tolist()
+    
+    # Size and floor of the materialized lists the user is held in or can
+    # enter, not counting the user's own row; empty lists count too
+    affected = sorted((set(holding) | set(qualifying)) - acted_on)
+    others = {}
+    for start in range(0, len(affected), CANDIDATE_LOAD_BATCH):
+        others.update(
+            (owner_id, (count, floor)) for owner_id, count, floor in db.session.query(
+                User.id,
+                db.func.count(TradeMatch.id),
+                db.func.min(TradeMatch.compatibility_score)
+            ).outerjoin(TradeMatch, db.and_(
+                TradeMatch.user1_id == User.id,
+                TradeMatch.user2_id != user_id,
+                TradeMatch.status == 'pending'
+            )).filter(
+                User.id.in_(affected[start:start + CANDIDATE_LOAD_BATCH]),
+                User.matches_materialized_at.isnot(None)
+            ).group_by(User.id)
+        )
+    
+    stale = set()
+    inserts = []
+    seen = set()
+    if scored is not None:
+        for i, owner_id in enumerate(candidates.ids.tolist()):
+            held = holding.get(owner_id)
+            if owner_id in acted_on:
+                continue
+            if held is None and (owner_id not in others or scores[i] <= settings.min_match_score):
+                continue
+            seen.add(owner_id)
+            count, floor = others.get(owner_id, (0, None))
+            full = count + 1 >= limit if held is not None else count >= limit
+            reasons = json.dumps(ai_matcher._match_reasons(geo_scores[i], product_scores[i], gti_scores[i]))
+            
+            if held is not None:
+                if scores[i] <= settings.min_match_score:
+                    seen.discard(owner_id)  # Handled below like an owner the prefilter dropped
+                elif not full or floor is None or scores[i] > floor:
+                    held.compatibility_score = float(scores[i])
+                    held.match_reasons = reasons
+                else:
+                    stale.add(owner_id)
+                continue
+            
+            if full and scores[i] < floor:
+                continue
+            if full and scores[i] == floor:
+                stale.add(owner_id)  # Ties are broken by id, let a full pass decide
+                continue
+            inserts.append({
+                'user1_id': owner_id,
+                'user2_id': user_id,
+                'compatibility_score': float(scores[i]),
+                'match_reasons': reasons
+            })
+            if full:
+                lowest = TradeMatch.query.filter_by(user1_id=owner_id, status='pending').order_by(
+                    TradeMatch.compatibility_score.asc(), TradeMatch.user2_id.desc()
+                ).first()
+                db.session.delete(lowest)
+    
+    # Holders the user no longer qualifies for
+    for owner_id, held in holding.items():
+        if owner_id in seen or owner_id in stale:
+            continue
+        count, _ = others.get(owner_id, (0, None))
+        if count + 1 >= limit:
+            stale.add(owner_id)  # Someone else may move up into the list
+        else:
+            db.session.delete(held)
+    
+    stale_ids = sorted(stale)
+    for start in range(0, len(stale_ids), CANDIDATE_LOAD_BATCH):
+        TradeMatch.query.filter(
+            TradeMatch.user1_id.in_(stale_ids[start:start + CANDIDATE_LOAD_BATCH]),
+            TradeMatch.status == 'pending'
+        ).delete(synchronize_session=False)
+    mark_matches_materialized(stale_ids, False)
+    db.session.flush()
+    insert_trade_matches(inserts)
+    db.session.commit()
+
+def reset_materialized_matches():
+    """Drop all pending stored matches so they are rebuilt under new settings
+    
+    Contacted and rejected matches are kept.
+    """
+    TradeMatch.query.filter_by(status='pending').delete(synchronize_session=False)
+    User.query.filter(User.matches_materialized_at.isnot(None)).update(
+        {User.matches_materialized_at: None}, synchronize_session=False
+    )
+    db.session.commit()
+    platform_metrics.invalidate()
+
+def get_stored_matches(user_id, limit=None):
+    """Read a user's top matches from TradeMatch, materializing them on first use
+    
+    The list is computed once and then only read: refresh_affected_matches
+    keeps it current as profiles change, and clears the user's
+    ``matches_materialized_at`` when it can't, as do settings changes.
+    """
+    table_size = platform_settings.current().max_matches_per_user
+    if limit is None:
+        limit = table_size
+    
+    query = db.session.query(TradeMatch, User).join(
+        User, TradeMatch.user2_id == User.id
+    ).filter(
+        TradeMatch.user1_id == user_id,
+        TradeMatch.status != 'rejected'
+    ).order_by(TradeMatch.compatibility_score.desc(), TradeMatch.user2_id.asc())
+    
+    if db.session.query(User.matches_materialized_at).filter(User.id == user_id).scalar() is None:
+        materialize_matches(user_id, max(limit, table_size))
+    rows = query.limit(limit).all()
+    
+    matches = []
+    for match, user in rows:
+        try:
+            reasons = json.loads(match.match_reasons or '[]')
+        except ValueError:
+            reasons = []
+        matches.append({
+            'user': user,
+            'score': match.compatibility_score,
+            'reasons': reasons,
+            'products': list(profile_features.get(user).product_list)
+        })
+    return matches
+
+def stored_head_ids(user_id, count):
+    """Ids of the first ``count`` matches get_stored_matches serves, in order"""
+    return [user2_id for (user2_id,) in db.session.query(TradeMatch.user2_id).filter(
+        TradeMatch.user1_id == user_id,
+        TradeMatch.status != 'rejected'
+    ).order_by(TradeMatch.compatibility_score.desc(), TradeMatch.user2_id.asc()).limit(count)]
+
+def serialize_match(match):
+    """JSON-serializable form of a match as returned by /api/matches"""
+    user = match['user']
+    return {
+        'id': user.id,
+        'company_name': user.company_name,
+        'country': user.country,
+        'user_type': user.user_type,
+        'business_description': user.business_description or '',
+        'products': match['products'],
+        'compatibility_score': round(match['score'] * 100, 1),
+        'match_reasons': match['reasons'],
+        'contact_person': user.contact_person or '',
+        'email': user.email,
+        'phone': user.phone or '',
+        'website': user.website or ''
+    }
+
 # Routes
 @app.route('/')
 def index():
@@ -410,7 +2865,12 @@ def register():
         user.set_password(data['password'])
         
         db.session.add(user)
+        db.session.flush()
+        sync_user_profile_tables(user)
         db.session.commit()
+        refresh_affected_matches(user.id)
+        platform_metrics.invalidate()
+        dashboard_counters.user_added(user)
         
         session['user_id'] = user.id
         return jsonify({'success': True, 'message': 'Registration successful'})
@@ -434,6 +2894,7 @@ def login():
             db.session.commit()
             
             session['user_id'] = user.id
+            remember_access(user)
             
             # Redirect admin users to admin dashboard
             if user.is_admin:
@@ -450,7 +2911,7 @@ def profile():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     
     if request.method == 'POST':
         data = request.get_json()
@@ -464,8 +2925,14 @@ def profile():
         user.languages = data.get('languages', '')
         user.preferred_countries = json.dumps(data.get('preferred_countries', []))
         user.website = data.get('website', '')
+        user.updated_at = datetime.utcnow()
+        sync_user_profile_tables(user)
         
         db.session.commit()
+        profile_features.invalidate(user.id)
+        semantic_index.update(user)
+        ann_index.update(user)
+        refresh_affected_matches(user.id)
         return jsonify({'success': True, 'message': 'Profile updated successfully'})
     
     # Parse JSON fields for display
@@ -486,23 +2953,13 @@ def dashboard():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     
     # Get AI-powered matches
-    matches = ai_matcher.find_matches(user.id)
+    matches = get_stored_matches(user.id)
     
     # Get statistics
-    total_users = User.query.count()
-    importers = User.query.filter_by(user_type='importer').count()
-    exporters = User.query.filter_by(user_type='exporter').count()
-    gti_users = User.query.filter(User.country.in_(GTI_COUNTRIES)).count()
-    
-    stats = {
-        'total_users': total_users,
-        'importers': importers,
-        'exporters': exporters,
-        'gti_users': gti_users
-    }
+    stats = dashboard_counters.snapshot()
     
     return render_template('dashboard.html', 
                          user=user, 
@@ -515,33 +2972,50 @@ def get_matches():
     if 'user_id' not in session:
         return jsonify({'error': 'Not authenticated'})
     
-    matches = ai_matcher.find_matches(session['user_id'])
-    
-    # Convert to JSON-serializable format
-    result = []
-    for match in matches:
-        user = match['user']
-        try:
-            products = json.loads(user.products_services or '[]')
-        except:
-            products = []
-        
-        result.append({
-            'id': user.id,
-            'company_name': user.company_name,
-            'country': user.country,
-            'user_type': user.user_type,
-            'business_description': user.business_description or '',
-            'products': products,
-            'compatibility_score': round(match['score'] * 100, 1),
-            'match_reasons': match['reasons'],
-            'contact_person': user.contact_person or '',
-            'email': user.email,
-            'phone': user.phone or '',
-            'website': user.website or ''
-        })
+    # ?format=ndjson streams one match per line as it is serialized
+    stream = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+    
+    # Deeper pages are ranked on demand, the first page comes from TradeMatch
+    table_size = platform_settings.current().max_matches_per_user
+    max_limit = API_MATCHES_STREAM_MAX_LIMIT if stream else API_MATCHES_MAX_LIMIT
+    limit = max(1, min(request.args.get('limit', table_size, type=int), max_limit))
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    # Cursors after the stored first page end in "~<n>": those first n
+    # stored matches were served already and are left out of live pages
+    cursor, marker, head = request.args.get('cursor', '', type=str).partition('~')
+    if (marker and not (head.isascii() and head.isdigit())) or (cursor and decode_match_cursor(cursor) is None):
+        return jsonify({'error': 'Invalid cursor'}), 400
+    head = int(head or 0)
+    next_cursor = None
+    if cursor or head or offset or limit > table_size:
+        user_id = session['user_id']
+        if offset and not head:
+            head = min(offset, table_size)
+            offset -= head
+        # Rejected candidates are hidden on every page, as on the stored one
+        exclude = set(stored_head_ids(user_id, head)) if head else set()
+        exclude.update(user2_id for (user2_id,) in db.session.query(TradeMatch.user2_id).filter_by(
+            user1_id=user_id, status='rejected'
+        ))
+        page = ai_matcher.ranked_page(user_id, limit=limit, offset=offset, cursor=cursor or None, exclude=exclude)
+        matches = ai_matcher.iter_matches(page)
+        if 0 < len(page[0]) == limit:
+            next_cursor = _match_cursor(page[1][-1], page[0][-1]) + (f'~{head}' if head else '')
+    else:
+        matches = get_stored_matches(session['user_id'], limit)
+        if 0 < len(matches) == limit:
+            next_cursor = f'~{len(matches)}'
+
     
-    return jsonify(result)
+    if stream:
+        lines = (app.json.dumps(serialize_match(match)) + '\n' for match in matches)
+        response = app.response_class(stream_with_context(lines), mimetype='application/x-ndjson')
+    else:
+        response = jsonify([serialize_match(match) for match in matches])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
 
 @app.route('/logout')
 def logout():
@@ -556,11 +3030,9 @@ def admin_dashboard():
     """Admin dashboard with overview metrics"""
     metrics = get_platform_metrics()
     recent_users = User.query.filter(User.user_type != 'admin').order_by(User.created_at.desc()).limit(10).all()
-    recent_matches = db.session.query(TradeMatch, User.alias('user1'), User.alias('user2')).join(
-        User.alias('user1'), TradeMatch.user1_id == User.alias('user1').id
-    ).join(
-        User.alias('user2'), TradeMatch.user2_id == User.alias('user2').id
-    ).order_by(TradeMatch.created_at.desc()).limit(10).all()
+    recent_matches = match_listing_query().order_by(
+        TradeMatch.created_at.desc(), TradeMatch.id.desc()
+    ).limit(10).all()
     
     return render_template('admin/dashboard.html', 
                          metrics=metrics, 
@@ -579,11 +3051,7 @@ def admin_users():
     query = User.query.filter(User.user_type != 'admin')
     
     if search:
-        query = query.filter(
-            (User.company_name.contains(search)) |
-            (User.email.contains(search)) |
-            (User.country.contains(search))
-        )
+        query = search_users(query, search)
     
     if filter_type != 'all':
         query = query.filter_by(user_type=filter_type)
@@ -597,9 +3065,15 @@ def admin_users():
     elif filter_status == 'inactive':
         query = query.filter_by(is_active=False)
     
-    users = query.order_by(User.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    if wants_keyset_page():
+        # Keyset pages are ordered by recency, even when searching
+        users = keyset_paginate(query, User.created_at, User.id, 20,
+                                cursor=request.args.get('cursor'),
+                                with_total=request.args.get('count', type=int) == 1)
+    else:
+        users = query.order_by(User.created_at.desc()).paginate(
+            page=page, per_page=20, error_out=False
+        )
     
     return render_template('admin/users.html', users=users, search=search, 
                          filter_type=filter_type, filter_status=filter_status)
@@ -613,11 +3087,23 @@ def admin_user_detail(user_id):
         (TradeMatch.user1_id == user_id) | (TradeMatch.user2_id == user_id)
     ).order_by(TradeMatch.created_at.desc()).all()
     
+    audit_log.flush()
     admin_logs = AdminLog.query.filter_by(target_user_id=user_id).order_by(AdminLog.timestamp.desc()).limit(10).all()
     
     return render_template('admin/user_detail.html', user=user, 
                          user_matches=user_matches, admin_logs=admin_logs)
 
+# action -> (User flag, new value, audit action, audit details)
+ADMIN_USER_ACTIONS = {
+    'verify': ('is_verified', True, 'VERIFY_USER', 'Verified user {}'),
+    'unverify': ('is_verified', False, 'UNVERIFY_USER', 'Removed verification from {}'),
+    'activate': ('is_active', True, 'ACTIVATE_USER', 'Activated user {}'),
+    'deactivate': ('is_active', False, 'DEACTIVATE_USER', 'Deactivated user {}')
+}
+
+# Most user ids accepted by one bulk action request
+BULK_ACTION_MAX_USERS = 1000
+
 @app.route('/admin/user/<int:user_id>/action', methods=['POST'])
 @admin_required
 def admin_user_action(user_id):
@@ -626,28 +3112,71 @@ def admin_user_action(user_id):
     action = request.json.get('action')
     admin_id = session['user_id']
     
-    if action == 'verify':
-        user.is_verified = True
-        log_admin_action(admin_id, 'VERIFY_USER', user_id, f'Verified user {user.company_name}')
-        
-    elif action == 'unverify':
-        user.is_verified = False
-        log_admin_action(admin_id, 'UNVERIFY_USER', user_id, f'Removed verification from {user.company_name}')
-        
-    elif action == 'activate':
-        user.is_active = True
-        log_admin_action(admin_id, 'ACTIVATE_USER', user_id, f'Activated user {user.company_name}')
-        
-    elif action == 'deactivate':
-        user.is_active = False
-        log_admin_action(admin_id, 'DEACTIVATE_USER', user_id, f'Deactivated user {user.company_name}')
-        
-    else:
+    if action not in ADMIN_USER_ACTIONS:
         return jsonify({'success': False, 'message': 'Invalid action'})
     
+    flag, value, log_action, details = ADMIN_USER_ACTIONS[action]
+    setattr(user, flag, value)
+    log_admin_action(admin_id, log_action, user_id, details.format(user.company_name))
+    
     db.session.commit()
+    platform_metrics.invalidate()
     return jsonify({'success': True, 'message': f'User {action}d successfully'})
 
+@app.route('/admin/users/action', methods=['POST'])
+@admin_required
+def admin_bulk_user_action():
+    """Apply one action to many users with a single UPDATE
+    
+    Expects ``{"action": ..., "user_ids": [...]}`` and reports, per id,
+    whether the user was ``updated``, already ``unchanged`` or ``not_found``.
+    """
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    if action not in ADMIN_USER_ACTIONS:
+        return jsonify({'success': False, 'message': 'Invalid action'})
+    
+    user_ids = data.get('user_ids', [])
+    if not isinstance(user_ids, list) or not all(
+        isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in user_ids
+    ):
+        return jsonify({'success': False, 'message': 'user_ids must be a list of integers'})
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return jsonify({'success': False, 'message': 'No users given'})
+    if len(user_ids) > BULK_ACTION_MAX_USERS:
+        return jsonify({'success': False, 'message': f'At most {BULK_ACTION_MAX_USERS} users per request'})
+    
+    flag, value, log_action, details = ADMIN_USER_ACTIONS[action]
+    column = getattr(User, flag)
+    current = {
+        user_id: (company_name, current_value)
+        for user_id, company_name, current_value in db.session.query(
+            User.id, User.company_name, column
+        ).filter(User.id.in_(user_ids))
+    }
+    changed = [user_id for user_id, (_, current_value) in current.items() if current_value != value]
+    
+    if changed:
+        User.query.filter(User.id.in_(changed)).update({flag: value}, synchronize_session=False)
+        db.session.commit()
+        audit_log.log_many(session['user_id'], log_action, [
+            (user_id, details.format(current[user_id][0])) for user_id in changed
+        ])
+        platform_metrics.invalidate()
+    
+    changed = set(changed)
+    results = {
+        str(user_id): 'not_found' if user_id not in current else 'updated' if user_id in changed else 'unchanged'
+        for user_id in user_ids
+    }
+    return jsonify({
+        'success': True,
+        'message': f'Applied {action} to {len(changed)} user(s)',
+        'updated': len(changed),
+        'results': results
+    })
+
 @app.route('/admin/analytics')
 @admin_required
 def admin_analytics():
@@ -669,19 +3198,12 @@ def admin_analytics():
     ).join(TradeMatch, User.id == TradeMatch.user1_id).group_by(User.country).all()
     
     # Product category distribution
-    all_users = User.query.filter(User.user_type != 'admin').all()
-    product_distribution = {}
-    for user in all_users:
-        if user.products_services:
-            try:
-                products = json.loads(user.products_services)
-                for product in products:
-                    if product in product_distribution:
-                        product_distribution[product] += 1
-                    else:
-                        product_distribution[product] = 1
-            except:
-                continue
+    product_distribution = dict(db.session.query(
+        UserProduct.category,
+        db.func.count(UserProduct.user_id).label('users')
+    ).join(User, User.id == UserProduct.user_id).filter(
+        User.user_type != 'admin'
+    ).group_by(UserProduct.category).order_by(db.desc('users'), UserProduct.category).all())
     
     return render_template('admin/analytics.html', 
                          metrics=metrics,
@@ -696,26 +3218,23 @@ def admin_matches():
     page = request.args.get('page', 1, type=int)
     status_filter = request.args.get('status', 'all', type=str)
     
-    query = db.session.query(TradeMatch, User.alias('user1'), User.alias('user2')).join(
-        User.alias('user1'), TradeMatch.user1_id == User.alias('user1').id
-    ).join(
-        User.alias('user2'), TradeMatch.user2_id == User.alias('user2').id
-    )
-    
-    if status_filter != 'all':
-        query = query.filter(TradeMatch.status == status_filter)
-    
-    matches = query.order_by(TradeMatch.created_at.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    query = match_listing_query(status_filter if status_filter != 'all' else None)
     
     # Match statistics
-    match_stats = {
-        'total': TradeMatch.query.count(),
-        'pending': TradeMatch.query.filter_by(status='pending').count(),
-        'contacted': TradeMatch.query.filter_by(status='contacted').count(),
-        'rejected': TradeMatch.query.filter_by(status='rejected').count()
-    }
+    match_stats = match_status_counts()
+    
+    if wants_keyset_page():
+        matches = keyset_paginate(query, TradeMatch.created_at, TradeMatch.id, 20,
+                                  cursor=request.args.get('cursor'),
+                                  with_total=request.args.get('count', type=int) == 1,
+                                  row_key=lambda row: (row[0].created_at, row[0].id))
+    else:
+        # The per-status counts already hold the total, so skip paginate's
+        # COUNT over the joined listing
+        matches = query.order_by(TradeMatch.created_at.desc()).paginate(
+            page=page, per_page=20, error_out=False, count=False
+        )
+        matches.total = match_stats['total'] if status_filter == 'all' else match_stats.get(status_filter, 0)
     
     return render_template('admin/matches.html', matches=matches, 
                          match_stats=match_stats, status_filter=status_filter)
@@ -727,45 +3246,16 @@ def admin_settings():
     if request.method == 'POST':
         settings_data = request.json
         admin_id = session['user_id']
-        
-        for key, value in settings_data.items():
-            setting = AdminSettings.query.filter_by(setting_key=key).first()
-            if setting:
-                setting.setting_value = str(value)
-                setting.updated_at = datetime.utcnow()
-                setting.updated_by = admin_id
-            else:
-                setting = AdminSettings(
-                    setting_key=key,
-                    setting_value=str(value),
-                    updated_by=admin_id
-                )
-                db.session.add(setting)
-        
-        db.session.commit()
+        previous = platform_settings.refresh()
+        settings = platform_settings.update(settings_data, admin_id)
+        if any(previous.values[key] != settings.values[key] for key in MATCHING_SETTINGS):
+            reset_materialized_matches()
         log_admin_action(admin_id, 'UPDATE_SETTINGS', None, f'Updated platform settings')
         
         return jsonify({'success': True, 'message': 'Settings updated successfully'})
     
-    # Get current settings
-    settings = {}
-    all_settings = AdminSettings.query.all()
-    for setting in all_settings:
-        settings[setting.setting_key] = setting.setting_value
-    
-    # Default settings if not set
-    default_settings = {
-        'platform_name': 'AfCFTA Trade Matchmaker',
-        'min_match_score': '0.3',
-        'max_matches_per_user': '10',
-        'require_verification': 'true',
-        'enable_gti_priority': 'true',
-        'maintenance_mode': 'false'
-    }
-    
-    for key, default_value in default_settings.items():
-        if key not in settings:
-            settings[key] = default_value
+    # Current settings, with defaults for keys never set
+    settings = dict(platform_settings.current().values)
     
     return render_template('admin/settings.html', settings=settings)
 
@@ -776,14 +3266,21 @@ def admin_logs():
     page = request.args.get('page', 1, type=int)
     action_filter = request.args.get('action', 'all', type=str)
     
+    audit_log.flush()
     query = db.session.query(AdminLog, User).join(User, AdminLog.admin_id == User.id)
     
     if action_filter != 'all':
         query = query.filter(AdminLog.action.contains(action_filter.upper()))
     
-    logs = query.order_by(AdminLog.timestamp.desc()).paginate(
-        page=page, per_page=50, error_out=False
-    )
+    if wants_keyset_page():
+        logs = keyset_paginate(query, AdminLog.timestamp, AdminLog.id, 50,
+                               cursor=request.args.get('cursor'),
+                               with_total=request.args.get('count', type=int) == 1,
+                               row_key=lambda row: (row[0].timestamp, row[0].id))
+    else:
+        logs = query.order_by(AdminLog.timestamp.desc()).paginate(
+            page=page, per_page=50, error_out=False
+        )
     
     return render_template('admin/logs.html', logs=logs, action_filter=action_filter)
 
@@ -1067,9 +3564,219 @@ def get_commodity_prices():
     }
     return jsonify(prices)
 
-# Initialize database
-with app.app_context():
+# ==================== CLI COMMANDS ====================
+
+matches_cli = AppGroup('matches', help='Maintain the materialized TradeMatch table.')
+
+# Read-only state shared with forked rebuild workers
+_rebuild_state = {}
+
+def _rebuild_shard(owner_indexes):
+    """Rank matches for a slice of owners against the shared candidate matrix
+    
+    Runs in a worker process and never touches the database; returns the
+    TradeMatch rows to insert and the number of pairs scored.
+    """
+    state = _rebuild_state
+    owners = state['owners']
+    candidates = state['candidates']
+    acted_on = state['acted_on']
+    now = datetime.utcnow()
+    
+    rows = []
+    pairs = 0
+    for i in owner_indexes:
+        owner = owners[i]
+        scores, geo_scores, product_scores, gti_scores = candidates.score(
+            owner, state['gti_priority'], state['semantic_weight']
+        )
+        pairs += len(scores)
+        
+        skip = acted_on.get(owner.id, ())
+        eligible = np.flatnonzero(scores > state['min_score'])
+        top = eligible[select_top_k(scores[eligible], candidates.ids[eligible], state['limit'] + len(skip))]
+        kept = 0
+        for j in top:
+            candidate_id = int(candidates.ids[j])
+            if candidate_id in skip:
+                continue
+            rows.append({
+                'user1_id': owner.id,
+                'user2_id': candidate_id,
+                'compatibility_score': float(scores[j]),
+                'match_reasons': json.dumps(AIMatchmaker._match_reasons(geo_scores[j], product_scores[j], gti_scores[j])),
+                'status': 'pending',
+                'created_at': now
+            })
+            kept += 1
+            if kept == state['limit']:
+                break
+    return [owners[i].id for i in owner_indexes], rows, pairs
+
+@matches_cli.command('rebuild')
+@click.option('--workers', type=int, default=None, help='Worker processes (defaults to the CPU count).')
+@click.option('--shard-size', type=int, default=500, show_default=True, help='Owners scored per task.')
+@click.option('--user-type', type=click.Choice(['importer', 'exporter', 'all']), default='all',
+              show_default=True, help='Whose match lists to rebuild.')
+def rebuild_matches_command(workers, shard_size, user_type):
+    """Recompute every stored match list, e.g. nightly after bulk imports."""
+    settings = platform_settings.current()
+    workers = workers or os.cpu_count() or 1
+    try:
+        context = multiprocessing.get_context('fork')
+    except ValueError:
+        context = None  # No fork on this platform; score in-process
+    
+    if settings.semantic_weight:
+        # Load the text index once so forked workers share its mmapped pages
+        if not semantic_index.ensure_ready():
+            click.echo("No semantic index; run 'flask matches semantic-index' to score profile text")
+        semantic_index.pinned = True
+    
+    owner_types = ['importer', 'exporter'] if user_type == 'all' else [user_type]
+    started = time.perf_counter()
+    total_pairs = 0
+    total_rows = 0
+    
+    for owner_type in owner_types:
+        candidate_type = 'exporter' if owner_type == 'importer' else 'importer'
+        owners = _profile_columns().filter(User.user_type == owner_type).order_by(User.id).all()
+        candidate_rows = _profile_columns().filter(User.user_type == candidate_type).order_by(User.id).all()
+        if not owners:
+            continue
+        if not candidate_rows:
+            TradeMatch.query.filter(
+                TradeMatch.user1_id.in_(db.session.query(User.id).filter(User.user_type == owner_type)),
+                TradeMatch.status == 'pending'
+            ).delete(synchronize_session=False)
+            mark_matches_materialized([owner.id for owner in owners])
+            db.session.commit()
+            continue
+        
+        acted_on = {}
+        for owner_id, candidate_id in db.session.query(TradeMatch.user1_id, TradeMatch.user2_id).filter(
+            TradeMatch.status != 'pending'
+        ):
+            acted_on.setdefault(owner_id, set()).add(candidate_id)
+        
+        _rebuild_state.update(
+            owners=owners,
+            candidates=CandidateMatrix([ProfileFeatures(row) for row in candidate_rows]),
+            acted_on=acted_on,
+            min_score=settings.min_match_score,
+            limit=settings.max_matches_per_user,
+            gti_priority=settings.enable_gti_priority,
+            semantic_weight=settings.semantic_weight
+        )
+        shards = [range(start, min(start + shard_size, len(owners))) for start in range(0, len(owners), shard_size)]
+        click.echo(f"Rebuilding {owner_type} matches: {len(owners):,} owners x {len(candidate_rows):,} candidates "
+                   f"in {len(shards)} shards on {workers if context else 1} worker(s)")
+        
+        # Forked workers inherit the matrix copy-on-write; they must not share DB connections
+        db.engine.dispose()
+        if context is not None and workers > 1:
+            pool = context.Pool(workers)
+            results = pool.imap_unordered(_rebuild_shard, shards)
+        else:
+            pool = None
+            results = map(_rebuild_shard, shards)
+        
+        done = 0
+        try:
+            for owner_ids, rows, pairs in results:
+                TradeMatch.query.filter(
+                    TradeMatch.user1_id.in_(owner_ids),
+                    TradeMatch.status == 'pending'
+                ).delete(synchronize_session=False)
+                insert_trade_matches(rows)
+                mark_matches_materialized(owner_ids)
+                db.session.commit()
+                
+                done += len(owner_ids)
+                total_pairs += pairs
+                total_rows += len(rows)
+                elapsed = time.perf_counter() - started
+                click.echo(f"  {done:,}/{len(owners):,} owners, {total_pairs / elapsed:,.0f} pairs/sec")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            _rebuild_state.clear()
+    semantic_index.pinned = False
+    
+    elapsed = time.perf_counter() - started
+    click.echo(f"Stored {total_rows:,} matches from {total_pairs:,} pairs in {elapsed:.1f}s "
+               f"({total_pairs / elapsed if elapsed else 0:,.0f} pairs/sec)")
+    if resource is not None:
+        # ru_maxrss is reported in kilobytes on Linux
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        child_peak_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        click.echo(f"Peak memory: {peak_kb / 1024:,.1f} MB main, {child_peak_kb / 1024:,.1f} MB largest worker")
+
+@matches_cli.command('semantic-index')
+def semantic_index_command():
+    """Refit the TF-IDF profile text index used by the semantic_weight setting."""
+    started = time.perf_counter()
+    documents, terms = semantic_index.fit()
+    click.echo(f"Indexed {documents:,} profiles over {terms:,} terms into {semantic_index.directory} "
+               f"in {time.perf_counter() - started:.1f}s")
+
+@matches_cli.command('ann-index')
+def ann_index_command():
+    """Rebuild the approximate nearest-neighbour index that narrows large candidate pools."""
+    started = time.perf_counter()
+    documents, lists = ann_index.fit()
+    click.echo(f"Clustered {documents:,} profiles into {lists:,} lists in {ann_index.directory} "
+               f"in {time.perf_counter() - started:.1f}s")
+
+app.cli.add_command(matches_cli)
+
+def upgrade_schema():
+    """Apply schema changes that db.create_all() does not make to existing tables"""
+    inspector = db.inspect(db.engine)
+    user_columns = {column['name'] for column in inspector.get_columns('user')}
+    with db.engine.begin() as connection:
+        if 'updated_at' not in user_columns:
+            connection.execute(db.text('ALTER TABLE "user" ADD COLUMN updated_at TIMESTAMP'))
+            connection.execute(db.text('UPDATE "user" SET updated_at = created_at'))
+        if 'matches_materialized_at' not in user_columns:
+            # Existing lists are recomputed once, on each owner's next read
+            connection.execute(db.text('ALTER TABLE "user" ADD COLUMN matches_materialized_at TIMESTAMP'))
+    
+    # Collapse duplicate (user1_id, user2_id) pairs before their unique index
+    # is created, keeping an acted-on row over a pending one, then the oldest
+    if 'uq_trade_match_user1_user2' not in {index['name'] for index in inspector.get_indexes('trade_match')}:
+        with db.engine.begin() as connection:
+            connection.execute(db.text("""
+                DELETE FROM trade_match WHERE id IN (
+                    SELECT duplicate.id FROM trade_match AS duplicate
+                    JOIN trade_match AS kept
+                      ON kept.user1_id = duplicate.user1_id
+                     AND kept.user2_id = duplicate.user2_id
+                     AND kept.id <> duplicate.id
+                    WHERE (kept.status <> 'pending' AND duplicate.status = 'pending')
+                       OR ((kept.status = 'pending') = (duplicate.status = 'pending') AND kept.id < duplicate.id)
+                )
+            """))
+    
+    # Indexes declared on models after their table was first created
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    
+    backfill_profile_tables()
+    create_search_index()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create tables and apply schema upgrades; run once per deploy."""
     db.create_all()
+    upgrade_schema()
+    click.echo(f"Database ready ({db.engine.url.get_backend_name()}, search: {search_backend or 'LIKE'})")
 
 if __name__ == '__main__':
+    # Production deploys run `flask --app app init-db` before starting workers
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
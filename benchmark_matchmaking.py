@@ -0,0 +1,363 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+
+# Benchmarks run against a throwaway SQLite database unless one is given,
+# and never overwrite the text and ANN indexes of the instance folder
+workdir = tempfile.mkdtemp()
+if 'DATABASE_URL' not in os.environ:
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'benchmark.db')
+os.environ['SEMANTIC_INDEX_DIR'] = os.path.join(workdir, 'semantic_index')
+os.environ['ANN_INDEX_DIR'] = os.path.join(workdir, 'ann_index')
+
+# Add the app directory to Python path
+sys.path.insert(0, os.path.abspath('.'))
+
+import numpy as np
+from werkzeug.security import generate_password_hash
+from app import app, db, User, TradeMatch, ai_matcher, candidate_index, ann_index, profile_features, AFCFTA_COUNTRIES, PRODUCT_CATEGORIES, backfill_profile_tables, upgrade_schema
+from create_sample_data import SAMPLE_EXPORTERS, SAMPLE_IMPORTERS
+
+INSERT_BATCH = 10000
+
+# Metrics where a larger value is an improvement
+HIGHER_IS_BETTER = ('speedup', 'recall_at_k')
+
+def synthesize_users(start, count, seed=42):
+    """Build ``count`` user rows shaped like the sample importer/exporter profiles
+
+    Each row copies one of the create_sample_data.py profiles and varies
+    the country, preferred countries and one product category, so the
+    distribution of field shapes stays realistic at any size.
+    """
+    rnd = random.Random(seed + start)
+    password_hash = generate_password_hash('password123')
+    now = datetime.utcnow()
+    shapes = SAMPLE_EXPORTERS + SAMPLE_IMPORTERS
+    categories = list(PRODUCT_CATEGORIES)
+
+    rows = []
+    for i in range(start, start + count):
+        shape = shapes[i % len(shapes)]
+        products = json.loads(shape['products_services'])
+        if rnd.random() < 0.5:
+            products = sorted(set(products) | {rnd.choice(categories)})
+        preferred = json.loads(shape['preferred_countries'])
+        preferred = rnd.sample(preferred, rnd.randint(0, len(preferred)))
+        preferred += rnd.sample(AFCFTA_COUNTRIES, rnd.randint(0, 2))
+        joined = now - timedelta(days=rnd.randint(1, 720))
+
+        rows.append({
+            'email': f'bench{i}@example.com',
+            'password_hash': password_hash,
+            'company_name': f"{shape['company_name']} #{i}",
+            'user_type': shape['user_type'],
+            'country': rnd.choice(AFCFTA_COUNTRIES),
+            'contact_person': shape['contact_person'],
+            'phone': shape['phone'],
+            'business_description': shape['business_description'],
+            'products_services': json.dumps(products),
+            'annual_volume': shape['annual_volume'],
+            'company_size': shape['company_size'],
+            'certifications': shape['certifications'],
+            'languages': shape['languages'],
+            'preferred_countries': json.dumps(preferred),
+            'website': shape['website'],
+            'is_active': True,
+            'is_admin': False,
+            'is_verified': rnd.random() < 0.3,
+            'created_at': joined,
+            'updated_at': joined
+        })
+    return rows
+
+def grow_user_table(target):
+    """Insert synthetic users until the table holds ``target`` rows"""
+    existing = User.query.count()
+    while existing < target:
+        batch = min(INSERT_BATCH, target - existing)
+        db.session.execute(User.__table__.insert(), synthesize_users(existing, batch))
+        db.session.commit()
+        existing += batch
+    backfill_profile_tables()
+    return existing
+
+def reset_caches():
+    """Drop in-process state so every size starts from the same point"""
+    candidate_index.reset()
+    shutil.rmtree(ann_index.directory, ignore_errors=True)  # Rebuilt by the ann suite
+    ann_index.reset()
+    profile_features.clear()
+    ai_matcher._pages.clear()
+
+def timed(fn, repeat):
+    """Call ``fn`` ``repeat`` times and return the median latency in ms"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+        db.session.expunge_all()
+    return float(np.median(samples))
+
+def benchmark_hot_path(size, queries, pairs):
+    """Time per-pair scoring, find_matches and the match-serving routes"""
+    rnd = random.Random(size)
+    user_ids = rnd.sample(range(1, size + 1), queries)
+    result = {'users': size}
+
+    # Per-pair scoring through the scalar API
+    users = User.query.filter(User.id.in_(rnd.sample(range(1, size + 1), min(size, 400)))).all()
+    importers = [u for u in users if u.user_type == 'importer']
+    exporters = [u for u in users if u.user_type == 'exporter']
+    sample_pairs = [(rnd.choice(importers), rnd.choice(exporters)) for _ in range(pairs)]
+    start = time.perf_counter()
+    for user1, user2 in sample_pairs:
+        ai_matcher.calculate_compatibility(user1, user2)
+    result['pair_us'] = round((time.perf_counter() - start) / pairs * 1e6, 2)
+    db.session.expunge_all()
+
+    # Full vectorized ranking
+    result['find_matches_ms'] = round(float(np.median([
+        timed(lambda: ai_matcher.find_matches(user_id), 1) for user_id in user_ids
+    ])), 2)
+
+    # Routes through the Flask test client; the first hit materializes TradeMatch
+    client = app.test_client()
+    failures = set()
+
+    def get(url):
+        response = client.get(url)
+        if response.status_code != 200:
+            failures.add(f"{url.split('?')[0]} {response.status_code}")
+        return response
+
+    cold = []
+    dashboard = []
+    api = []
+    api_page = []
+    for user_id in user_ids:
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        TradeMatch.query.filter_by(user1_id=user_id).delete()
+        db.session.commit()
+        cold.append(timed(lambda: get('/api/matches'), 1))
+        dashboard.append(timed(lambda: get('/dashboard'), 3))
+        api.append(timed(lambda: get('/api/matches'), 3))
+        cursor = get('/api/matches').headers.get('X-Next-Cursor')
+        if cursor:
+            api_page.append(timed(lambda: get(f'/api/matches?cursor={cursor}&limit=50'), 3))
+    result['api_matches_cold_ms'] = round(float(np.median(cold)), 2)
+    result['dashboard_ms'] = round(float(np.median(dashboard)), 2)
+    result['api_matches_ms'] = round(float(np.median(api)), 2)
+    if api_page:
+        result['api_matches_page_ms'] = round(float(np.median(api_page)), 2)
+    if failures:
+        result['route_errors'] = sorted(failures)
+    return result
+
+def benchmark_prefilter(size, thresholds, queries):
+    """Compare full-table scans against candidate index pre-filtering"""
+    rnd = random.Random(size)
+    user_ids = rnd.sample(range(1, size + 1), queries)
+    candidate_index.sync()
+
+    results = []
+    for min_score in thresholds:
+        kept = 0
+        pool = 0
+        for user_id in user_ids:
+            user = db.session.get(User, user_id)
+            opposite_type = 'exporter' if user.user_type == 'importer' else 'importer'
+            candidate_ids, pool_size = candidate_index.candidates(
+                profile_features.get(user), opposite_type, min_score
+            )
+            kept += len(candidate_ids)
+            pool += pool_size
+
+        full_ms = float(np.mean([
+            timed(lambda: ai_matcher.find_matches(user_id, min_score=min_score, prefilter=False), 1)
+            for user_id in user_ids
+        ]))
+        indexed_ms = float(np.mean([
+            timed(lambda: ai_matcher.find_matches(user_id, min_score=min_score, prefilter=True), 1)
+            for user_id in user_ids
+        ]))
+        results.append({
+            'users': size,
+            'min_score': min_score,
+            'candidates_loaded': round(kept / pool, 3) if pool else 0,
+            'full_scan_ms': round(full_ms, 1),
+            'prefiltered_ms': round(indexed_ms, 1),
+            'speedup': round(full_ms / indexed_ms, 2) if indexed_ms else None
+        })
+    return results
+
+def benchmark_ann(size, queries, k):
+    """Compare ANN retrieval plus exact re-ranking against exhaustive scoring
+    
+    ``recall_at_k`` is the share of the exhaustive top ``k`` the ANN path
+    also returns; a different candidate tied on the k-th score counts as
+    found, since the exhaustive ranking breaks such ties by id only.
+    """
+    rnd = random.Random(size)
+    user_ids = rnd.sample(range(1, size + 1), queries)
+    
+    start = time.perf_counter()
+    ann_index.fit()
+    build_s = time.perf_counter() - start
+    
+    min_pool = app.config['ANN_MIN_POOL']
+    app.config['ANN_MIN_POOL'] = 0
+    try:
+        found = 0
+        expected = 0
+        exact_ms = []
+        ann_ms = []
+        for user_id in user_ids:
+            start = time.perf_counter()
+            exact = ai_matcher.find_matches(user_id, limit=k, approximate=False)
+            exact_ms.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            approximate = ai_matcher.find_matches(user_id, limit=k, approximate=True)
+            ann_ms.append((time.perf_counter() - start) * 1000)
+            db.session.expunge_all()
+            
+            if exact:
+                floor = exact[-1]['score']
+                found += min(len(exact), sum(1 for m in approximate if m['score'] >= floor))
+                expected += len(exact)
+    finally:
+        app.config['ANN_MIN_POOL'] = min_pool
+    
+    exact_ms = float(np.median(exact_ms))
+    ann_ms = float(np.median(ann_ms))
+    return {
+        'users': size,
+        'k': k,
+        'recall_at_k': round(found / expected, 3) if expected else None,
+        'exact_ms': round(exact_ms, 1),
+        'ann_ms': round(ann_ms, 1),
+        'speedup': round(exact_ms / ann_ms, 2) if ann_ms else None,
+        'build_s': round(build_s, 1)
+    }
+
+def environment_info():
+    """Describe the code and interpreter the results were produced with"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'database': db.engine.url.get_backend_name()
+    }
+
+def compare_results(baseline, current, tolerance):
+    """Return human readable regressions of ``current`` against ``baseline``"""
+    regressions = []
+    for suite, rows in current.items():
+        if suite == 'environment':
+            continue
+        previous = {
+            (row['users'], row.get('min_score')): row for row in baseline.get(suite, [])
+        }
+        for row in rows:
+            old = previous.get((row['users'], row.get('min_score')))
+            if old is None:
+                continue
+            for metric, value in row.items():
+                if metric in ('users', 'min_score', 'k', 'candidates_loaded') or not isinstance(value, (int, float)):
+                    continue
+                before = old.get(metric)
+                if not before:
+                    continue
+                change = (value - before) / before
+                if metric in HIGHER_IS_BETTER:
+                    change = -change
+                if change > tolerance:
+                    regressions.append(f"{suite} users={row['users']} {metric}: {before} -> {value} ({change:+.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the matchmaking hot path')
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='comma separated user table sizes, up to 1000000')
+    parser.add_argument('--suites', default='hotpath,prefilter,ann',
+                        help='comma separated suites to run: hotpath, prefilter, ann')
+    parser.add_argument('--thresholds', default='0.3,0.5,0.6',
+                        help='comma separated min_match_score values for the prefilter suite')
+    parser.add_argument('--queries', type=int, default=5,
+                        help='users timed per size')
+    parser.add_argument('--pairs', type=int, default=20000,
+                        help='pairs timed for per-pair scoring')
+    parser.add_argument('--ann-k', type=int, default=10,
+                        help='top matches compared for the ANN recall suite')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown against the baseline before failing')
+    args = parser.parse_args()
+
+    sizes = sorted(int(s) for s in args.sizes.split(','))
+    suites = [s.strip() for s in args.suites.split(',')]
+    thresholds = [float(t) for t in args.thresholds.split(',')]
+
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        results = {'environment': environment_info()}
+        for size in sizes:
+            print(f"\nGrowing user table to {size:,} rows...")
+            grow_user_table(size)
+            reset_caches()
+
+            if 'hotpath' in suites:
+                row = benchmark_hot_path(size, args.queries, args.pairs)
+                results.setdefault('hotpath', []).append(row)
+                print('  ' + '  '.join(f"{k}={v}" for k, v in row.items() if k != 'users'))
+
+            if 'prefilter' in suites:
+                for row in benchmark_prefilter(size, thresholds, args.queries):
+                    results.setdefault('prefilter', []).append(row)
+                    print(f"  min_score={row['min_score']:<4} loaded={row['candidates_loaded']:.1%} "
+                          f"full={row['full_scan_ms']}ms prefiltered={row['prefiltered_ms']}ms "
+                          f"speedup={row['speedup']}x")
+
+            if 'ann' in suites:
+                row = benchmark_ann(size, args.queries, args.ann_k)
+                results.setdefault('ann', []).append(row)
+                print(f"  ann recall@{row['k']}={row['recall_at_k']} exact={row['exact_ms']}ms "
+                      f"ann={row['ann_ms']}ms speedup={row['speedup']}x build={row['build_s']}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, results, args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.compare} (commit {baseline.get('environment', {}).get('commit')}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+if __name__ == '__main__':
+    main()
@@ -7,7 +7,159 @@ from datetime import datetime
 # Add the app directory to Python path
 sys.path.insert(0, os.path.abspath('.'))
 
-from app import app, db, User, TradeMatch, AdminSettings, AdminLog, Document, ChatMessage, TradeInsight, FinanceCalculation, AFCFTA_COUNTRIES, GTI_COUNTRIES, PRODUCT_CATEGORIES
+from app import app, db, User, TradeMatch, AdminSettings, AdminLog, Document, ChatMessage, TradeInsight, FinanceCalculation, AFCFTA_COUNTRIES, GTI_COUNTRIES, PRODUCT_CATEGORIES, backfill_profile_tables, upgrade_schema
+
+# Sample Exporters
+SAMPLE_EXPORTERS = [
+    {
+        'email': 'africagrains@example.com',
+        'company_name': 'Africa Grains Export Ltd',
+        'country': 'Ghana',
+        'user_type': 'exporter',
+        'contact_person': 'Kwame Asante',
+        'phone': '+233 XXX XXX XXX',
+        'business_description': 'Leading exporter of premium cocoa, coffee, and cashew nuts from West Africa. We specialize in organic and fair-trade certified products with 20+ years of experience in international trade.',
+        'products_services': json.dumps(['agricultural_products']),
+        'annual_volume': '1m_5m',
+        'company_size': 'medium',
+        'certifications': 'Organic Certification, Fair Trade, HACCP, ISO 22000',
+        'languages': 'English, French, Twi',
+        'preferred_countries': json.dumps(['Kenya', 'South Africa', 'Nigeria', 'Egypt']),
+        'website': 'https://africagrains.com'
+    },
+    {
+        'email': 'eastexports@example.com',
+        'company_name': 'East African Textiles Co.',
+        'country': 'Kenya',
+        'user_type': 'exporter',
+        'contact_person': 'Amina Hassan',
+        'phone': '+254 XXX XXX XXX',
+        'business_description': 'Manufacturer and exporter of high-quality cotton textiles, traditional African fabrics, and modern apparel. We combine traditional craftsmanship with modern manufacturing techniques.',
+        'products_services': json.dumps(['textiles_clothing']),
+        'annual_volume': '500k_1m',
+        'company_size': 'small',
+        'certifications': 'OEKO-TEX Standard 100, GOTS (Global Organic Textile Standard)',
+        'languages': 'English, Swahili, Arabic',
+        'preferred_countries': json.dumps(['Ghana', 'South Africa', 'Rwanda', 'Tanzania']),
+        'website': 'https://eastafricantextiles.co.ke'
+    },
+    {
+        'email': 'pharmaexport@example.com',
+        'company_name': 'African Pharmaceuticals Export',
+        'country': 'South Africa',
+        'user_type': 'exporter',
+        'contact_person': 'Dr. Nelson Mandela Jr.',
+        'phone': '+27 XXX XXX XXX',
+        'business_description': 'Leading pharmaceutical exporter specializing in generic medicines, traditional African remedies, and medical equipment. WHO-approved manufacturing facilities with international quality standards.',
+        'products_services': json.dumps(['chemicals_pharmaceuticals']),
+        'annual_volume': '5m_plus',
+        'company_size': 'large',
+        'certifications': 'WHO GMP, FDA Approved, ISO 13485, ISO 14001',
+        'languages': 'English, Afrikaans, Zulu, Xhosa',
+        'preferred_countries': json.dumps(['Ghana', 'Kenya', 'Nigeria', 'Egypt', 'Morocco']),
+        'website': 'https://africapharmaexport.co.za'
+    },
+    {
+        'email': 'techexport@example.com',
+        'company_name': 'Rwanda Tech Solutions',
+        'country': 'Rwanda',
+        'user_type': 'exporter',
+        'contact_person': 'Jean Paul Kagame',
+        'phone': '+250 XXX XXX XXX',
+        'business_description': 'Innovative technology solutions provider exporting software, mobile applications, and IT consulting services across Africa. Specializing in fintech, agtech, and e-commerce solutions.',
+        'products_services': json.dumps(['electronics_technology', 'services_consulting']),
+        'annual_volume': '100k_500k',
+        'company_size': 'small',
+        'certifications': 'ISO 27001, CMMI Level 3, Microsoft Gold Partner',
+        'languages': 'English, French, Kinyarwanda',
+        'preferred_countries': json.dumps(['Kenya', 'Ghana', 'Tanzania', 'Uganda']),
+        'website': 'https://rwandatech.rw'
+    }
+]
+
+# Sample Importers
+SAMPLE_IMPORTERS = [
+    {
+        'email': 'foodimport@example.com',
+        'company_name': 'Continental Food Imports',
+        'country': 'Nigeria',
+        'user_type': 'importer',
+        'contact_person': 'Chinwe Okafor',
+        'phone': '+234 XXX XXX XXX',
+        'business_description': 'Major food importer supplying supermarket chains and retail outlets across West Africa. We focus on high-quality agricultural products, processed foods, and beverages.',
+        'products_services': json.dumps(['agricultural_products']),
+        'annual_volume': '1m_5m',
+        'company_size': 'medium',
+        'certifications': 'NAFDAC Approved, HACCP, Halal Certification',
+        'languages': 'English, Hausa, Igbo, Yoruba',
+        'preferred_countries': json.dumps(['Ghana', 'Ivory Coast', 'Cameroon', 'Senegal']),
+        'website': 'https://continentalfood.ng'
+    },
+    {
+        'email': 'fashionimport@example.com',
+        'company_name': 'African Fashion Hub',
+        'country': 'Morocco',
+        'user_type': 'importer',
+        'contact_person': 'Fatima Al-Zahra',
+        'phone': '+212 XXX XXX XXX',
+        'business_description': 'Premium fashion retailer importing contemporary African designs, traditional textiles, and modern apparel. We operate 15 stores across North Africa and distribute to European markets.',
+        'products_services': json.dumps(['textiles_clothing', 'handicrafts_arts']),
+        'annual_volume': '500k_1m',
+        'company_size': 'medium',
+        'certifications': 'CE Marking, REACH Compliance',
+        'languages': 'Arabic, French, English, Berber',
+        'preferred_countries': json.dumps(['Kenya', 'Ghana', 'South Africa', 'Senegal']),
+        'website': 'https://africanfashionhub.ma'
+    },
+    {
+        'email': 'healthimport@example.com',
+        'company_name': 'East Africa Health Supplies',
+        'country': 'Tanzania',
+        'user_type': 'importer',
+        'contact_person': 'Dr. Mwalimu Nyerere',
+        'phone': '+255 XXX XXX XXX',
+        'business_description': 'Healthcare supply chain specialist importing medical equipment, pharmaceuticals, and healthcare technologies for hospitals and clinics across East Africa.',
+        'products_services': json.dumps(['chemicals_pharmaceuticals', 'machinery_equipment']),
+        'annual_volume': '1m_5m',
+        'company_size': 'small',
+        'certifications': 'TMDA Approved, ISO 13485, WHO Prequalification',
+        'languages': 'English, Swahili, Arabic',
+        'preferred_countries': json.dumps(['South Africa', 'Kenya', 'Egypt', 'Morocco']),
+        'website': 'https://healthsupplies.tz'
+    },
+    {
+        'email': 'constructimport@example.com',
+        'company_name': 'Pyramid Construction Imports',
+        'country': 'Egypt',
+        'user_type': 'importer',
+        'contact_person': 'Ahmed Hassan El-Masry',
+        'phone': '+20 XXX XXX XXX',
+        'business_description': 'Leading construction materials importer serving major infrastructure projects across North Africa. We specialize in heavy machinery, building materials, and engineering equipment.',
+        'products_services': json.dumps(['construction_materials', 'machinery_equipment']),
+        'annual_volume': '5m_plus',
+        'company_size': 'large',
+        'certifications': 'CE Marking, ISO 9001, OHSAS 18001',
+        'languages': 'Arabic, English, French',
+        'preferred_countries': json.dumps(['South Africa', 'Morocco', 'Ghana', 'Kenya']),
+        'website': 'https://pyramidconstruction.eg'
+    },
+    {
+        'email': 'agricimport@example.com',
+        'company_name': 'Mauritius Agri Imports',
+        'country': 'Mauritius',
+        'user_type': 'importer',
+        'contact_person': 'Raj Patel',
+        'phone': '+230 XXX XXX XXX',
+        'business_description': 'Agricultural technology and equipment importer serving the Indian Ocean islands and East Africa. We focus on sustainable farming solutions and modern agricultural machinery.',
+        'products_services': json.dumps(['machinery_equipment', 'agricultural_products']),
+        'annual_volume': '100k_500k',
+        'company_size': 'micro',
+        'certifications': 'ISO 9001, CE Marking',
+        'languages': 'English, French, Hindi, Creole',
+        'preferred_countries': json.dumps(['South Africa', 'Kenya', 'Tanzania', 'Madagascar']),
+        'website': 'https://mauritiusagri.mu'
+    }
+]
 
 def create_sample_data():
     """Create sample users and data for testing the platform"""
@@ -16,6 +168,7 @@ def create_sample_data():
         # Clear existing data
         db.drop_all()
         db.create_all()
+        upgrade_schema()
         
         print("Creating sample AfCFTA trade data...")
         
@@ -37,160 +190,8 @@ def create_sample_data():
         print("   This admin account has full access to the admin panel.")
         print()
         
-        # Sample Exporters
-        exporters = [
-            {
-                'email': 'africagrains@example.com',
-                'company_name': 'Africa Grains Export Ltd',
-                'country': 'Ghana',
-                'user_type': 'exporter',
-                'contact_person': 'Kwame Asante',
-                'phone': '+233 XXX XXX XXX',
-                'business_description': 'Leading exporter of premium cocoa, coffee, and cashew nuts from West Africa. We specialize in organic and fair-trade certified products with 20+ years of experience in international trade.',
-                'products_services': json.dumps(['agricultural_products']),
-                'annual_volume': '1m_5m',
-                'company_size': 'medium',
-                'certifications': 'Organic Certification, Fair Trade, HACCP, ISO 22000',
-                'languages': 'English, French, Twi',
-                'preferred_countries': json.dumps(['Kenya', 'South Africa', 'Nigeria', 'Egypt']),
-                'website': 'https://africagrains.com'
-            },
-            {
-                'email': 'eastexports@example.com',
-                'company_name': 'East African Textiles Co.',
-                'country': 'Kenya',
-                'user_type': 'exporter',
-                'contact_person': 'Amina Hassan',
-                'phone': '+254 XXX XXX XXX',
-                'business_description': 'Manufacturer and exporter of high-quality cotton textiles, traditional African fabrics, and modern apparel. We combine traditional craftsmanship with modern manufacturing techniques.',
-                'products_services': json.dumps(['textiles_clothing']),
-                'annual_volume': '500k_1m',
-                'company_size': 'small',
-                'certifications': 'OEKO-TEX Standard 100, GOTS (Global Organic Textile Standard)',
-                'languages': 'English, Swahili, Arabic',
-                'preferred_countries': json.dumps(['Ghana', 'South Africa', 'Rwanda', 'Tanzania']),
-                'website': 'https://eastafricantextiles.co.ke'
-            },
-            {
-                'email': 'pharmaexport@example.com',
-                'company_name': 'African Pharmaceuticals Export',
-                'country': 'South Africa',
-                'user_type': 'exporter',
-                'contact_person': 'Dr. Nelson Mandela Jr.',
-                'phone': '+27 XXX XXX XXX',
-                'business_description': 'Leading pharmaceutical exporter specializing in generic medicines, traditional African remedies, and medical equipment. WHO-approved manufacturing facilities with international quality standards.',
-                'products_services': json.dumps(['chemicals_pharmaceuticals']),
-                'annual_volume': '5m_plus',
-                'company_size': 'large',
-                'certifications': 'WHO GMP, FDA Approved, ISO 13485, ISO 14001',
-                'languages': 'English, Afrikaans, Zulu, Xhosa',
-                'preferred_countries': json.dumps(['Ghana', 'Kenya', 'Nigeria', 'Egypt', 'Morocco']),
-                'website': 'https://africapharmaexport.co.za'
-            },
-            {
-                'email': 'techexport@example.com',
-                'company_name': 'Rwanda Tech Solutions',
-                'country': 'Rwanda',
-                'user_type': 'exporter',
-                'contact_person': 'Jean Paul Kagame',
-                'phone': '+250 XXX XXX XXX',
-                'business_description': 'Innovative technology solutions provider exporting software, mobile applications, and IT consulting services across Africa. Specializing in fintech, agtech, and e-commerce solutions.',
-                'products_services': json.dumps(['electronics_technology', 'services_consulting']),
-                'annual_volume': '100k_500k',
-                'company_size': 'small',
-                'certifications': 'ISO 27001, CMMI Level 3, Microsoft Gold Partner',
-                'languages': 'English, French, Kinyarwanda',
-                'preferred_countries': json.dumps(['Kenya', 'Ghana', 'Tanzania', 'Uganda']),
-                'website': 'https://rwandatech.rw'
-            }
-        ]
-        
-        # Sample Importers
-        importers = [
-            {
-                'email': 'foodimport@example.com',
-                'company_name': 'Continental Food Imports',
-                'country': 'Nigeria',
-                'user_type': 'importer',
-                'contact_person': 'Chinwe Okafor',
-                'phone': '+234 XXX XXX XXX',
-                'business_description': 'Major food importer supplying supermarket chains and retail outlets across West Africa. We focus on high-quality agricultural products, processed foods, and beverages.',
-                'products_services': json.dumps(['agricultural_products']),
-                'annual_volume': '1m_5m',
-                'company_size': 'medium',
-                'certifications': 'NAFDAC Approved, HACCP, Halal Certification',
-                'languages': 'English, Hausa, Igbo, Yoruba',
-                'preferred_countries': json.dumps(['Ghana', 'Ivory Coast', 'Cameroon', 'Senegal']),
-                'website': 'https://continentalfood.ng'
-            },
-            {
-                'email': 'fashionimport@example.com',
-                'company_name': 'African Fashion Hub',
-                'country': 'Morocco',
-                'user_type': 'importer',
-                'contact_person': 'Fatima Al-Zahra',
-                'phone': '+212 XXX XXX XXX',
-                'business_description': 'Premium fashion retailer importing contemporary African designs, traditional textiles, and modern apparel. We operate 15 stores across North Africa and distribute to European markets.',
-                'products_services': json.dumps(['textiles_clothing', 'handicrafts_arts']),
-                'annual_volume': '500k_1m',
-                'company_size': 'medium',
-                'certifications': 'CE Marking, REACH Compliance',
-                'languages': 'Arabic, French, English, Berber',
-                'preferred_countries': json.dumps(['Kenya', 'Ghana', 'South Africa', 'Senegal']),
-                'website': 'https://africanfashionhub.ma'
-            },
-            {
-                'email': 'healthimport@example.com',
-                'company_name': 'East Africa Health Supplies',
-                'country': 'Tanzania',
-                'user_type': 'importer',
-                'contact_person': 'Dr. Mwalimu Nyerere',
-                'phone': '+255 XXX XXX XXX',
-                'business_description': 'Healthcare supply chain specialist importing medical equipment, pharmaceuticals, and healthcare technologies for hospitals and clinics across East Africa.',
-                'products_services': json.dumps(['chemicals_pharmaceuticals', 'machinery_equipment']),
-                'annual_volume': '1m_5m',
-                'company_size': 'small',
-                'certifications': 'TMDA Approved, ISO 13485, WHO Prequalification',
-                'languages': 'English, Swahili, Arabic',
-                'preferred_countries': json.dumps(['South Africa', 'Kenya', 'Egypt', 'Morocco']),
-                'website': 'https://healthsupplies.tz'
-            },
-            {
-                'email': 'constructimport@example.com',
-                'company_name': 'Pyramid Construction Imports',
-                'country': 'Egypt',
-                'user_type': 'importer',
-                'contact_person': 'Ahmed Hassan El-Masry',
-                'phone': '+20 XXX XXX XXX',
-                'business_description': 'Leading construction materials importer serving major infrastructure projects across North Africa. We specialize in heavy machinery, building materials, and engineering equipment.',
-                'products_services': json.dumps(['construction_materials', 'machinery_equipment']),
-                'annual_volume': '5m_plus',
-                'company_size': 'large',
-                'certifications': 'CE Marking, ISO 9001, OHSAS 18001',
-                'languages': 'Arabic, English, French',
-                'preferred_countries': json.dumps(['South Africa', 'Morocco', 'Ghana', 'Kenya']),
-                'website': 'https://pyramidconstruction.eg'
-            },
-            {
-                'email': 'agricimport@example.com',
-                'company_name': 'Mauritius Agri Imports',
-                'country': 'Mauritius',
-                'user_type': 'importer',
-                'contact_person': 'Raj Patel',
-                'phone': '+230 XXX XXX XXX',
-                'business_description': 'Agricultural technology and equipment importer serving the Indian Ocean islands and East Africa. We focus on sustainable farming solutions and modern agricultural machinery.',
-                'products_services': json.dumps(['machinery_equipment', 'agricultural_products']),
-                'annual_volume': '100k_500k',
-                'company_size': 'micro',
-                'certifications': 'ISO 9001, CE Marking',
-                'languages': 'English, French, Hindi, Creole',
-                'preferred_countries': json.dumps(['South Africa', 'Kenya', 'Tanzania', 'Madagascar']),
-                'website': 'https://mauritiusagri.mu'
-            }
-        ]
-        
         # Create all users
-        all_users = exporters + importers
+        all_users = SAMPLE_EXPORTERS + SAMPLE_IMPORTERS
         created_users = []
         
         for user_data in all_users:
@@ -215,6 +216,7 @@ def create_sample_data():
             created_users.append(user)
         
         db.session.commit()
+        backfill_profile_tables()
         
         print(f"Created {len(created_users)} sample users:")
         print("\nEXPORTERS:")
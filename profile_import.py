@@ -0,0 +1,64 @@
+import os
+import sys
+import argparse
+import subprocess
+
+# Default ceiling for `import app`, in seconds; every gunicorn worker pays it
+DEFAULT_BUDGET = 1.5
+
+def profile_import(module='app'):
+    """Run ``python -X importtime -c "import <module>"`` in a fresh interpreter
+
+    Returns ``(total_us, entries)`` where entries are
+    ``(self_us, cumulative_us, depth, name)`` in import order.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"import {module} failed")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((int(self_us), int(cumulative_us), depth, name.strip()))
+
+    total_us = next(cumulative for _, cumulative, depth, name in entries if depth == 0 and name == module)
+    return total_us, entries
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize `python -X importtime` for the app and enforce a startup budget')
+    parser.add_argument('--module', default='app', help='module to import')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help='fail when the import takes longer than this many seconds')
+    parser.add_argument('--top', type=int, default=15, help='number of direct imports to list')
+    parser.add_argument('--runs', type=int, default=3, help='imports to time; the fastest one is reported')
+    args = parser.parse_args()
+
+    total_us, entries = min((profile_import(args.module) for _ in range(args.runs)), key=lambda run: run[0])
+
+    # importtime lists children before their parent, so the module's own
+    # imports are the depth-1 entries since the previous top-level import
+    end = next(i for i, e in enumerate(entries) if e[2] == 0 and e[3] == args.module)
+    start = end
+    while start > 0 and entries[start - 1][2] > 0:
+        start -= 1
+    direct = sorted((e for e in entries[start:end] if e[2] == 1), key=lambda e: e[1], reverse=True)
+    print(f"import {args.module}: {total_us / 1e6:.3f}s (budget {args.budget:.3f}s)\n")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for self_us, cumulative_us, _, name in direct[:args.top]:
+        print(f"{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {name}")
+    print(f"{entries[end][0] / 1000:>22.1f}ms  ({args.module} module body)")
+
+    if total_us / 1e6 > args.budget:
+        print(f"\nOver budget by {total_us / 1e6 - args.budget:.3f}s")
+        sys.exit(1)
+    print("\nWithin budget")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# app reads its settings at import time, so point it at a scratch database first
+_workdir = tempfile.mkdtemp(prefix='matchmaking-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_workdir, 'test.db')
+os.environ['SEMANTIC_INDEX_DIR'] = os.path.join(_workdir, 'semantic_index')
+os.environ['ANN_INDEX_DIR'] = os.path.join(_workdir, 'ann_index')
+os.environ['AUDIT_LOG_ASYNC'] = '0'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as matchmaking  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    matchmaking.app.config['TESTING'] = True
+    with matchmaking.app.app_context():
+        matchmaking.db.create_all()
+        matchmaking.upgrade_schema()
+        # Every test starts from empty tables, so forget what earlier ones cached
+        matchmaking.platform_settings.refresh()
+        matchmaking.profile_features.clear()
+        matchmaking.candidate_index.reset()
+        matchmaking.semantic_index.reset()
+        matchmaking.ann_index.reset()
+        matchmaking.ai_matcher._pages.clear()
+        yield matchmaking.app
+        matchmaking.db.session.remove()
+        matchmaking.db.drop_all()
+        shutil.rmtree(os.environ['SEMANTIC_INDEX_DIR'], ignore_errors=True)
+        shutil.rmtree(os.environ['ANN_INDEX_DIR'], ignore_errors=True)
+
+
+@pytest.fixture
+def admin_client(app):
+    admin = matchmaking.User(email='admin@example.com', company_name='Admin', user_type='admin',
+                             country='Ghana', is_admin=True)
+    admin.set_password('admin-password')
+    matchmaking.db.session.add(admin)
+    matchmaking.db.session.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = admin.id
+    return client
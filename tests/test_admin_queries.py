@@ -0,0 +1,101 @@
+import json
+import re
+
+import pytest
+from jinja2 import ChoiceLoader, DictLoader
+from sqlalchemy import event
+
+import app as matchmaking
+
+# Stand-in for admin/matches.html that reads every listed column of both sides
+MATCHES_TEMPLATE = (
+    '{% for match, user1, user2 in matches.items %}'
+    '{{ match.id }} {{ match.status }} {{ match.compatibility_score }} '
+    '{% for user in (user1, user2) %}'
+    '{{ user.id }} {{ user.company_name }} {{ user.email }} {{ user.country }} {{ user.user_type }} {{ user.is_verified }} '
+    '{% endfor %}\n'
+    '{% endfor %}'
+    'total={{ match_stats.total }}'
+)
+
+
+@pytest.fixture
+def matches(app):
+    def add_user(email, user_type, country):
+        user = matchmaking.User(email=email, company_name=email.split('@')[0], user_type=user_type, country=country,
+                                business_description='Bulk cocoa and coffee', products_services=json.dumps(['Cocoa']))
+        user.set_password('password')
+        matchmaking.db.session.add(user)
+        return user
+
+    importer = add_user('importer@example.com', 'importer', 'Kenya')
+    exporters = [add_user(f'exporter{i}@example.com', 'exporter', 'Ghana') for i in range(3)]
+    matchmaking.db.session.flush()
+    for i, exporter in enumerate(exporters):
+        matchmaking.db.session.add(matchmaking.TradeMatch(
+            user1_id=importer.id, user2_id=exporter.id, compatibility_score=0.9 - i / 10,
+            status='rejected' if i == 2 else 'pending'
+        ))
+    matchmaking.db.session.commit()
+    matchmaking.db.session.expunge_all()
+    return importer, exporters
+
+
+@pytest.fixture
+def statements(app):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append(statement)
+
+    event.listen(matchmaking.db.engine, 'before_cursor_execute', capture)
+    yield captured
+    event.remove(matchmaking.db.engine, 'before_cursor_execute', capture)
+
+
+def listed_user_columns(statement, alias):
+    select_list = statement.split(' FROM ')[0]
+    return set(re.findall(rf'\b{alias}\.(\w+)', select_list))
+
+
+def test_match_listing_query_joins_each_user_once(matches, statements):
+    rows = matchmaking.match_listing_query().all()
+
+    assert len(rows) == 3
+    assert len(statements) == 1
+    statement = statements[0]
+    assert re.findall(r'JOIN "?user"? AS (\w+)', statement) == ['user1', 'user2']
+    assert listed_user_columns(statement, 'user1') == set(matchmaking.MATCH_LISTING_USER_COLUMNS)
+    assert listed_user_columns(statement, 'user2') == set(matchmaking.MATCH_LISTING_USER_COLUMNS)
+
+
+def test_match_listing_query_filters_by_status(matches):
+    rows = matchmaking.match_listing_query('rejected').all()
+
+    assert [match.status for match, _, _ in rows] == ['rejected']
+
+
+@pytest.mark.parametrize('query_string', ['', '?status=pending', '?cursor=', '?cursor=&count=1'])
+def test_admin_matches_renders(app, admin_client, matches, statements, monkeypatch, query_string):
+    monkeypatch.setattr(app.jinja_env, 'loader', ChoiceLoader([
+        DictLoader({'admin/matches.html': MATCHES_TEMPLATE}), app.jinja_env.loader
+    ]))
+
+    admin_client.get('/admin/matches')  # Caches the admin's access check in the session
+    statements.clear()
+
+    response = admin_client.get('/admin/matches' + query_string)
+
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert 'importer importer@example.com Kenya' in body
+    assert 'exporter0 exporter0@example.com Ghana' in body
+    assert 'total=3' in body
+    listings = [statement for statement in statements if 'user1' in statement]
+    assert listings
+    for statement in listings:
+        assert re.findall(r'JOIN "?user"? AS (\w+)', statement) == ['user1', 'user2']
+        assert listed_user_columns(statement, 'user1') <= set(matchmaking.MATCH_LISTING_USER_COLUMNS)
+        assert listed_user_columns(statement, 'user2') <= set(matchmaking.MATCH_LISTING_USER_COLUMNS)
+    # Rendering reads only listed columns, so no user row is lazy-loaded
+    assert not [statement for statement in statements if re.search(r'FROM "?user"?\s', statement)]
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+import app as matchmaking
+
+
+@pytest.fixture
+def admin_id(app):
+    admin = matchmaking.User(email='admin@example.com', company_name='Admin', user_type='admin',
+                             country='Ghana', is_admin=True)
+    admin.set_password('admin-password')
+    matchmaking.db.session.add(admin)
+    matchmaking.db.session.commit()
+    return admin.id
+
+
+@pytest.fixture
+def writer(app):
+    return matchmaking.AuditLogWriter()
+
+
+def buffer(writer, *admin_ids):
+    for i, admin_id in enumerate(admin_ids):
+        writer._queue.put_nowait({'admin_id': admin_id, 'action': f'ACTION_{i}', 'target_user_id': None,
+                                  'details': None, 'timestamp': datetime.utcnow()})
+
+
+def test_flush_drops_only_entries_that_cannot_be_written(writer, admin_id):
+    buffer(writer, admin_id, None, admin_id)
+
+    assert writer.flush() == 2
+    assert writer._queue.empty()
+    assert sorted(log.action for log in matchmaking.AdminLog.query) == ['ACTION_0', 'ACTION_2']
+    assert writer.flush() == 0
+
+
+def test_flush_keeps_entries_while_the_database_is_unavailable(writer, admin_id):
+    buffer(writer, admin_id, admin_id)
+    matchmaking.AdminLog.__table__.drop(matchmaking.db.engine)
+
+    assert writer.flush() == 0
+    assert writer._queue.qsize() == 2
+
+    matchmaking.AdminLog.__table__.create(matchmaking.db.engine)
+    assert writer.flush() == 2
+    assert matchmaking.AdminLog.query.count() == 2
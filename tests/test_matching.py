@@ -0,0 +1,161 @@
+import json
+import random
+
+import pytest
+
+import app as matchmaking
+
+COUNTRIES = ['Ghana', 'Kenya', 'Nigeria', 'Morocco', 'Zambia', 'Egypt', 'Atlantis']
+WORDS = 'cocoa coffee cotton textiles solar cement steel logistics dairy rice timber gold'.split()
+
+
+def make_profile(rng, user_type, email):
+    """A random profile, including the malformed and missing values the scorers special-case"""
+    preferred = rng.sample(COUNTRIES, rng.randint(0, 3))
+    products = rng.sample(sorted(matchmaking.PRODUCT_CATEGORIES), rng.randint(0, 3))
+    user = matchmaking.User(
+        email=email,
+        company_name=email.split('@')[0],
+        user_type=user_type,
+        country=rng.choice(COUNTRIES),
+        preferred_countries=rng.choice([json.dumps(preferred), json.dumps(preferred), '', 'not json']),
+        products_services=rng.choice([json.dumps(products), json.dumps(products), '', '{broken']),
+        languages=rng.choice([None, 'english', 'English,French', 'french,arabic', 'swahili']),
+        company_size=rng.choice(sorted(matchmaking.COMPANY_SIZE_ORDINALS) + [None, 'unknown']),
+        business_description=' '.join(rng.sample(WORDS, 3))
+    )
+    user.set_password('password')
+    return user
+
+
+@pytest.fixture
+def population(app):
+    rng = random.Random(2024)
+    users = [make_profile(rng, 'importer' if i % 2 else 'exporter', f'user{i}@example.com') for i in range(60)]
+    matchmaking.db.session.add_all(users)
+    matchmaking.db.session.commit()
+    return rng, [user.id for user in users]
+
+
+def stored_pending(owner_id):
+    rows = matchmaking.TradeMatch.query.filter_by(user1_id=owner_id, status='pending').all()
+    return sorted((-row.compatibility_score, row.user2_id) for row in rows)
+
+
+def fresh_pending(owner_id, limit):
+    acted_on = {row.user2_id for row in matchmaking.TradeMatch.query.filter(
+        matchmaking.TradeMatch.user1_id == owner_id, matchmaking.TradeMatch.status != 'pending'
+    )}
+    matches = matchmaking.ai_matcher.find_matches(owner_id, limit=limit + len(acted_on), approximate=False)
+    return [(-m['score'], m['user'].id) for m in matches if m['user'].id not in acted_on][:limit]
+
+
+@pytest.mark.parametrize('semantic_weight', ['0', '0.3'])
+def test_vectorized_scores_match_scalar_path(population, semantic_weight):
+    _, user_ids = population
+    matchmaking.platform_settings.update({'semantic_weight': semantic_weight}, None)
+    if semantic_weight != '0':
+        matchmaking.semantic_index.fit()
+    min_score = matchmaking.platform_settings.current().min_match_score
+
+    for user_id in user_ids[:10]:
+        user = matchmaking.db.session.get(matchmaking.User, user_id)
+        candidates, scores, geo_scores, product_scores, gti_scores = matchmaking.ai_matcher.score_candidates(
+            user, prefilter=False
+        )
+        expected = []
+        for i, candidate_id in enumerate(candidates.ids.tolist()):
+            candidate = matchmaking.db.session.get(matchmaking.User, candidate_id)
+            score, reasons = matchmaking.ai_matcher.calculate_compatibility(user, candidate)
+            assert scores[i] == score
+            assert matchmaking.ai_matcher._match_reasons(geo_scores[i], product_scores[i], gti_scores[i]) == reasons
+            if score > min_score:
+                expected.append((-score, candidate_id, reasons))
+
+        for prefilter in (False, True):
+            matches = matchmaking.ai_matcher.find_matches(user_id, limit=len(user_ids), prefilter=prefilter,
+                                                          approximate=False)
+            assert [(-m['score'], m['user'].id, m['reasons']) for m in matches] == sorted(expected)
+
+
+def test_refresh_affected_matches_equals_fresh_materialization(population):
+    rng, user_ids = population
+    matchmaking.platform_settings.update({'max_matches_per_user': '5'}, None)
+    for user_id in user_ids:
+        matchmaking.get_stored_matches(user_id)
+
+    # Acted-on rows must be kept and never offered again
+    for row in matchmaking.TradeMatch.query.filter(matchmaking.TradeMatch.id % 7 == 0):
+        row.status = rng.choice(['contacted', 'rejected'])
+    matchmaking.db.session.commit()
+    for user_id in user_ids:
+        matchmaking.mark_matches_materialized([user_id], False)
+        matchmaking.get_stored_matches(user_id)
+
+    for edit in range(8):
+        user = matchmaking.db.session.get(matchmaking.User, rng.choice(user_ids))
+        donor = make_profile(rng, user.user_type, f'donor{edit}@example.com')
+        for field in ('country', 'preferred_countries', 'products_services', 'languages', 'company_size'):
+            setattr(user, field, getattr(donor, field))
+        user.updated_at = matchmaking.datetime.utcnow()
+        matchmaking.db.session.commit()
+        matchmaking.profile_features.invalidate(user.id)
+        matchmaking.refresh_affected_matches(user.id)
+
+    for user_id in user_ids:
+        matchmaking.get_stored_matches(user_id)  # Rematerializes lists the refresh left stale
+        assert stored_pending(user_id) == fresh_pending(user_id, 5)
+
+
+def test_candidate_index_finds_rows_inserted_with_old_timestamps(population):
+    rng, user_ids = population
+    matchmaking.candidate_index.sync()
+
+    # Bulk imports write updated_at as given, which can be older than the index watermark or missing
+    imported = [make_profile(rng, 'importer' if i % 2 else 'exporter', f'import{i}@example.com') for i in range(6)]
+    matchmaking.db.session.add_all(imported)
+    matchmaking.db.session.commit()
+    imported_ids = [user.id for user in imported]
+    matchmaking.User.query.filter(matchmaking.User.id.in_(imported_ids[::2])).update(
+        {'updated_at': matchmaking.datetime(2001, 1, 1)}, synchronize_session=False)
+    matchmaking.User.query.filter(matchmaking.User.id.in_(imported_ids[1::2])).update(
+        {'updated_at': None}, synchronize_session=False)
+    matchmaking.db.session.commit()
+
+    for user_id in user_ids[:10]:
+        exact = matchmaking.ai_matcher.find_matches(user_id, limit=100, prefilter=False, approximate=False)
+        prefiltered = matchmaking.ai_matcher.find_matches(user_id, limit=100, prefilter=True, approximate=False)
+        assert [m['user'].id for m in prefiltered] == [m['user'].id for m in exact]
+    assert set(imported_ids) <= set(matchmaking.candidate_index._entries)
+
+
+@pytest.mark.parametrize('cursor', ['garbage', '0x1.8p-1', '0x1.8p-1:x', 'zz:3~2', '~', '~x', '~-1', '0x1.8p-1:3~2~1'])
+def test_api_matches_rejects_malformed_cursors(app, population, cursor):
+    _, user_ids = population
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_ids[0]
+
+    response = client.get('/api/matches', query_string={'cursor': cursor})
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Invalid cursor'}
+
+
+def test_api_matches_pages_with_cursors(app, population):
+    _, user_ids = population
+    matchmaking.platform_settings.update({'max_matches_per_user': '3'}, None)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_ids[0]
+
+    expected = [m['user'].id for m in matchmaking.ai_matcher.find_matches(user_ids[0], limit=len(user_ids))]
+    seen, cursor = [], ''
+    while True:
+        response = client.get('/api/matches', query_string={'cursor': cursor})
+        assert response.status_code == 200
+        seen += [match['id'] for match in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert seen == expected
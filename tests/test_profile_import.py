@@ -0,0 +1,11 @@
+import profile_import
+
+
+def test_import_app_within_startup_budget():
+    # Best of three, as `python profile_import.py` reports, so one slow run does not fail the suite
+    total_us, entries = min((profile_import.profile_import() for _ in range(3)), key=lambda run: run[0])
+
+    assert total_us / 1e6 <= profile_import.DEFAULT_BUDGET
+    imported = {name for _, _, _, name in entries}
+    assert 'sklearn' not in imported
+    assert 'scipy' not in imported